@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from career_embeddings import create_profile_text
+from embedding_client import EmbeddingClient
+from embedding_store import write_store
+from preprocess import process_file
+from recommender import CareerRecommender
+from stub_embed_server import start_stub_server
+
+# Benchmarks every pipeline stage on synthetic data and emits one JSON
+# document of {stage, size, metric, value, unit} records, so runs from
+# different releases can be diffed with --compare.
+
+
+class SyntheticEmbeddings:
+    """Lazily generated clustered vectors: rows are produced per slice, never all at once."""
+
+    def __init__(self, n, dim, n_clusters=256, seed=0):
+        self.n = n
+        self.dim = dim
+        self.seed = seed
+        self.centers = np.random.default_rng(seed).standard_normal((n_clusters, dim)).astype(np.float32)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(self.n)
+        else:
+            start, stop = key, key + 1
+        rng = np.random.default_rng((self.seed, start))
+        labels = rng.integers(0, len(self.centers), stop - start)
+        block = self.centers[labels] + 0.8 * rng.standard_normal((stop - start, self.dim)).astype(np.float32)
+        return block if isinstance(key, slice) else block[0]
+
+
+def synthetic_metadata(base, n, seed=0):
+    """`n` profile rows resampled from the real corpus in `base`."""
+    rows = base.sample(n=n, replace=True, random_state=seed).reset_index(drop=True)
+    rows["text"] = [create_profile_text(p) for p in rows.to_dict("records")]
+    return rows
+
+
+def synthetic_scraped_profile(row, rng):
+    """A raw scraped profile (the shape preprocess.py parses) built from a CSV row."""
+    years = rng.randint(0, 15)
+    return {
+        "element": {
+            "experience": [{"position": row["current_position"], "duration": f"{years} yrs {rng.randint(0, 11)} mos"}],
+            "currentPosition": [{"companyName": row["current_company"]}],
+            "skills": [{"name": s.strip()} for s in str(row["total_skills"]).split(",") if s.strip()],
+            "education": [{"degree": row["education_degree"], "schoolName": row["education_institution"]}],
+            "certifications": [{"title": c.strip()} for c in str(row["certifications"]).split(",") if c.strip()],
+            "location": {"parsed": {"city": row["city"], "state": row["state"], "country": row["country"]}},
+        }
+    }
+
+
+def timed_calls(fn, args_list):
+    """Per-call latencies in milliseconds."""
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+class Results:
+    def __init__(self):
+        self.records = []
+
+    def add(self, stage, metric, value, unit, size=None):
+        self.records.append({"stage": stage, "size": size, "metric": metric, "value": float(value), "unit": unit})
+        label = f"{stage}[{size}]" if size is not None else stage
+        print(f"  {label:<40} {metric:<12} {value:12.3f} {unit}", file=sys.stderr)
+
+    def add_latencies(self, stage, latencies, size=None):
+        self.add(stage, "p50", np.percentile(latencies, 50), "ms", size)
+        self.add(stage, "p99", np.percentile(latencies, 99), "ms", size)
+        self.add(stage, "mean", latencies.mean(), "ms", size)
+
+
+def bench_preprocess(results, base, workdir, n_profiles, seed=0):
+    rng = random.Random(seed)
+    rows = base.sample(n=n_profiles, replace=True, random_state=seed).to_dict("records")
+    json_path = os.path.join(workdir, "synthetic_profiles.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump([synthetic_scraped_profile(r, rng) for r in rows], f)
+
+    start = time.perf_counter()
+    count = process_file(json_path, os.path.join(workdir, "synthetic_profiles.csv"))
+    results.add("preprocess.process_file", "throughput", count / (time.perf_counter() - start), "profiles/s")
+
+    start = time.perf_counter()
+    for row in rows:
+        create_profile_text(row)
+    results.add("create_profile_text", "throughput", len(rows) / (time.perf_counter() - start), "profiles/s")
+
+
+def bench_embedding(results, base, n_texts, dim, latency_ms, per_item_ms):
+    server, url = start_stub_server(dim=dim, latency_ms=latency_ms, per_item_ms=per_item_ms)
+    texts = [create_profile_text(p) for p in base.sample(n=n_texts, replace=True, random_state=0).to_dict("records")]
+    try:
+        for workers in (1, 4):
+            with EmbeddingClient(url, max_workers=workers) as client:
+                start = time.perf_counter()
+                client.embed_many(texts)
+                elapsed = time.perf_counter() - start
+            results.add(f"embedding.embed_many(workers={workers})", "throughput", n_texts / elapsed, "texts/s")
+    finally:
+        server.shutdown()
+
+
+def bench_corpus(results, base, workdir, size, dim, n_queries, seed=0):
+    store_path = os.path.join(workdir, f"store_{size}")
+    metadata = synthetic_metadata(base, size, seed)
+    embeddings = SyntheticEmbeddings(size, dim, seed=seed)
+
+    start = time.perf_counter()
+    write_store(metadata, store_path, embeddings=embeddings, model_name="synthetic")
+    results.add("embedding_store.write_store", "seconds", time.perf_counter() - start, "s", size)
+    del metadata
+
+    start = time.perf_counter()
+    recommender = CareerRecommender.from_store(store_path)
+    results.add("CareerRecommender.from_store", "seconds", time.perf_counter() - start, "s", size)
+
+    rng = np.random.default_rng(seed)
+    picks = np.sort(rng.choice(size, size=n_queries, replace=False))
+    queries = np.asarray(recommender.embeddings[picks]) + 0.05 * rng.standard_normal((n_queries, dim))
+    skills = recommender.df["total_skills"].iloc[picks].tolist()
+    args = [(q,) for q in queries]
+
+    results.add_latencies("find_similar_profiles", timed_calls(recommender.find_similar_profiles, args), size)
+    results.add_latencies("recommend_roles", timed_calls(recommender.recommend_roles, args), size)
+    results.add_latencies("recommend_skills", timed_calls(recommender.recommend_skills, args), size)
+    results.add_latencies(
+        "recommend", timed_calls(lambda q, s: recommender.recommend(q, user_skills=s), zip(queries, skills)), size
+    )
+
+    batch = min(32, n_queries)
+    start = time.perf_counter()
+    recommender.recommend_batch(queries[:batch], user_skills=skills[:batch], as_records=True)
+    results.add("recommend_batch(32)", "per_query", (time.perf_counter() - start) * 1000 / batch, "ms", size)
+
+    del recommender
+    shutil.rmtree(store_path, ignore_errors=True)
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current, baseline_path, threshold=0.10):
+    """Print metrics that moved more than `threshold` relative to a previous run."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["stage"], r["size"], r["metric"]): r["value"] for r in json.load(f)["results"]}
+    print(f"\nChanges vs {baseline_path} (>{threshold:.0%}):", file=sys.stderr)
+    for r in current:
+        old = baseline.get((r["stage"], r["size"], r["metric"]))
+        if old:
+            change = (r["value"] - old) / old
+            if abs(change) > threshold:
+                print(f"  {r['stage']}[{r['size']}] {r['metric']}: {old:.3f} -> {r['value']:.3f} ({change:+.0%})",
+                      file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic corpora.")
+    parser.add_argument("--csv", default="csv/combined.csv", help="Real rows resampled into synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000],
+                        help="Corpus sizes, e.g. 5000 50000 1000000 (1M x 1024 dims needs ~4 GB of disk)")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100, help="Queries per latency measurement")
+    parser.add_argument("--parse-profiles", type=int, default=20_000)
+    parser.add_argument("--embed-texts", type=int, default=2_000)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0, help="Stub server delay per request")
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.5, help="Stub server delay per text")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["preprocess", "embedding", "search"])
+    parser.add_argument("--output", default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to diff against")
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv).fillna("")
+    results = Results()
+    workdir = tempfile.mkdtemp(prefix="career_bench_")
+    try:
+        if "preprocess" not in args.skip:
+            bench_preprocess(results, base, workdir, args.parse_profiles)
+        if "embedding" not in args.skip:
+            bench_embedding(results, base, args.embed_texts, args.dim, args.embed_latency_ms, args.embed_per_item_ms)
+        if "search" not in args.skip:
+            for size in args.sizes:
+                bench_corpus(results, base, workdir, size, args.dim, min(args.queries, size))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"environment": environment(), "config": vars(args), "results": results.records}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results.records, args.compare)
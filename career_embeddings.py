@@ -1,28 +1,29 @@
-import requests
 import os
-import json
 import pandas as pd
 import joblib
 import time
 from tqdm import tqdm
-from sklearn.metrics.pairwise import cosine_similarity
 
-# Ollama API setup
-OLLAMA_URL = "http://localhost:11434/api/embed"
-MODEL_NAME = "bge-m3"
+from embedding_cache import EmbeddingCache
+from embedding_client import OLLAMA_URL, MODEL_NAME, EmbeddingClient
+from dedup import dedup_profiles, print_summary
+from embedding_store import write_store
+from json_stream import iter_json_values
+
+_client = None
+
+
+def get_client():
+    """Shared embedding client, created on first use."""
+    global _client
+    if _client is None:
+        _client = EmbeddingClient(OLLAMA_URL, MODEL_NAME)
+    return _client
 
 
 def create_embedding(text_list):
-    """Generate embeddings from Ollama's API with timing."""
-    start_time = time.time()
-    r = requests.post(
-        OLLAMA_URL,
-        json={"model": MODEL_NAME, "input": text_list}
-    )
-    r.raise_for_status()
-    elapsed = time.time() - start_time
-    print(f"⏱️ Embedding batch of {len(text_list)} items took {elapsed:.2f} seconds")
-    return r.json()["embeddings"]
+    """Generate embeddings for one batch from Ollama's API."""
+    return get_client().embed(text_list)
 
 
 def create_profile_text(profile):
@@ -58,16 +59,23 @@ def create_profile_text(profile):
     return ". ".join(parts)
 
 
-def batch(iterable, n=50):
-    """Helper: Split data into chunks of size n."""
-    for i in range(0, len(iterable), n):
-        yield iterable[i:i+n]
+def read_profiles(file_path="combined.json"):
+    """Read profile dicts from a JSON array or JSONL file (see fixing_jsons.py)."""
+    return list(iter_json_values(file_path))
 
 
-def load_json_profiles(file_path="combined.json"):
-    """Load and prepare career chunks from combined.json."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def load_json_profiles(file_path="combined.json", cache_path="data/embedding_cache.sqlite", dedup=False):
+    """Load and prepare career chunks from combined.json.
+
+    Embeddings are looked up in the on-disk cache at `cache_path` first, so
+    only new or changed profile texts are sent to the embedding service.
+    Pass `cache_path=None` to embed everything. With `dedup`, exact and
+    near-duplicate profiles are dropped first (see dedup.py).
+    """
+    data = read_profiles(file_path)
+    if dedup:
+        data, report = dedup_profiles(data)
+        print_summary(report)
 
     chunks = []
     text_list = []
@@ -82,18 +90,36 @@ def load_json_profiles(file_path="combined.json"):
         text_list.append(text)
         chunks.append(profile)
 
+    cache = EmbeddingCache(cache_path, MODEL_NAME) if cache_path else None
+    all_embeddings = cache.get_many(text_list) if cache is not None else [None] * len(text_list)
+    missing = list(dict.fromkeys(t for t, e in zip(text_list, all_embeddings) if e is None))
+    if cache is not None:
+        stats = cache.stats()
+        print(
+            f"🔹 Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({len(missing)} unique texts to embed)"
+        )
+
     print(f"🔹 Generating embeddings in batches...")
-    all_embeddings = []
+    client = get_client()
     embedding_start = time.time()
 
-    # Process in batches to avoid freezing
-    for i, batch_texts in enumerate(batch(text_list, 50)):  # You can adjust 50 → 100 if your system is strong
-        print(f"\n🔸 Processing batch {i+1}/{len(text_list)//50 + 1} ({len(batch_texts)} profiles)...")
-        batch_embeddings = create_embedding(batch_texts)
-        all_embeddings.extend(batch_embeddings)
+    # Batches run concurrently and are resized from observed latency
+    with tqdm(total=len(missing), desc="Embedding profiles") as progress:
+        new_embeddings = client.embed_many(missing, progress=progress)
+
+    if cache is not None:
+        cache.put_many(missing, new_embeddings)
+        cache.close()
+    embedded = dict(zip(missing, new_embeddings))
+    all_embeddings = [e if e is not None else embedded[t] for t, e in zip(text_list, all_embeddings)]
 
     total_embed_time = time.time() - embedding_start
-    print(f"\n✅ Embedding generation completed in {total_embed_time:.2f} seconds")
+    stats = client.stats()
+    print(
+        f"\n✅ Embedding generation completed in {total_embed_time:.2f} seconds "
+        f"({stats['batches']} batches, {stats['retries']} retries)"
+    )
 
     # Attach embeddings to profiles
     for i, emb in enumerate(all_embeddings):
@@ -105,9 +131,11 @@ def load_json_profiles(file_path="combined.json"):
 
 
 if __name__ == "__main__":
-    chunks = load_json_profiles("combined.json")
+    chunks = load_json_profiles("combined.json", dedup=True)
     df = pd.DataFrame.from_records(chunks)
     os.makedirs("data", exist_ok=True)
     joblib.dump(df, "data/embeddings.joblib")
     print("✅ Embeddings saved to data/embeddings.joblib")
+    write_store(df, "data/store", model_name=MODEL_NAME)
+    print("✅ Memory-mapped embedding store saved to data/store")
     print(f"Total profiles processed: {len(chunks)}")
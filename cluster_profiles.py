@@ -0,0 +1,197 @@
+import os
+import hashlib
+import argparse
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+from embedding_cache import EmbeddingCache
+from embedding_client import EmbeddingClient
+from vector_index import ExactIndex
+
+# Per-cluster summaries of the skill clustering in main.ipynb
+# (models/skill_clusters2.joblib), computed once so "which cluster am I in
+# and what's typical there" is a centroid lookup instead of a corpus scan.
+# The clusters live in the space of skills-only embeddings (each profile's
+# `total_skills` string embedded as is), not the profile-text embeddings of
+# the embedding store, so corpus rows and queries are embedded that way too.
+
+CLUSTER_MODEL_FILE = "models/skill_clusters2.joblib"
+# What the rows given to ClusterProfiles.build are embeddings of
+EMBEDDED_FIELD = "total_skills"
+
+
+def profiles_path(model_path=CLUSTER_MODEL_FILE):
+    """Where the summaries of a KMeans model are stored: next to it, with a _profiles suffix."""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}_profiles.joblib"
+
+
+def skill_texts(total_skills):
+    """The texts main.ipynb embeds for clustering: `total_skills`, with "Unknown" when missing."""
+    return [value if isinstance(value, str) else "Unknown" for value in total_skills]
+
+
+def embed_skills(total_skills, client=None, cache_path="data/embedding_cache.sqlite"):
+    """Skills-only embeddings (float32 rows) of `total_skills`, the vectors the skill clusters are fit on.
+
+    Vectors in the embedding cache at `cache_path` are reused, so only skill
+    strings never seen before go to `client` (a default EmbeddingClient).
+    """
+    texts = skill_texts(total_skills)
+    cache = EmbeddingCache(cache_path) if cache_path else None
+    try:
+        found = cache.get_many(texts) if cache is not None else [None] * len(texts)
+        missing = list(dict.fromkeys(t for t, e in zip(texts, found) if e is None))
+        embedded = {}
+        if missing:
+            active = client or EmbeddingClient()
+            try:
+                embedded = dict(zip(missing, active.embed_many(missing)))
+            finally:
+                if client is None:
+                    active.close()
+            if cache is not None:
+                cache.put_many(missing, [embedded[t] for t in missing])
+    finally:
+        if cache is not None:
+            cache.close()
+    return np.asarray([e if e is not None else embedded[t] for t, e in zip(texts, found)], dtype=np.float32)
+
+
+def model_fingerprint(kmeans):
+    """Changes whenever the KMeans model is refit."""
+    centers = np.ascontiguousarray(kmeans.cluster_centers_, dtype=np.float64)
+    return hashlib.sha1(centers.tobytes()).hexdigest()
+
+
+class ClusterProfiles:
+    """Members, top skills and representative profiles of every KMeans cluster.
+
+    Member ids are rows of the corpus the summaries were built from and are
+    stored grouped by cluster (`order[offsets[c]:offsets[c + 1]]`).
+    Representatives are the members closest to their centroid. Queries are
+    skills-only embeddings (see `embed_skills`), assigned with the same
+    Euclidean rule as `KMeans.predict`.
+    """
+
+    def __init__(self, centers, order, offsets, top_skills, representatives, fingerprint, n_profiles,
+                 embedded=EMBEDDED_FIELD):
+        self.centers = np.asarray(centers, dtype=np.float32)
+        self._center_norms = (self.centers ** 2).sum(axis=1)
+        self.order = order
+        self.offsets = offsets
+        self.top_skills = top_skills
+        self.representatives = representatives
+        self.fingerprint = fingerprint
+        self.n_profiles = n_profiles
+        self.embedded = embedded
+
+    @classmethod
+    def build(cls, kmeans, embeddings, skills, top_n=20, n_representatives=10):
+        """Summaries of `kmeans` over the corpus' skills-only `embeddings` (`embed_skills`) and its SkillMatrix."""
+        if kmeans.cluster_centers_.shape[1] != embeddings.shape[1]:
+            raise ValueError(
+                f"KMeans model has {kmeans.cluster_centers_.shape[1]} features, embeddings have {embeddings.shape[1]}"
+            )
+        profiles = cls(kmeans.cluster_centers_, None, None, None, None, model_fingerprint(kmeans), len(embeddings))
+        k = len(profiles.centers)
+
+        labels, distances = [], []
+        for start in range(0, len(embeddings), ExactIndex.block_size):
+            block_labels, block_distances = profiles.assign(embeddings[start:start + ExactIndex.block_size])
+            labels.append(block_labels)
+            distances.append(block_distances)
+        labels = np.concatenate(labels) if labels else np.empty(0, dtype=np.int64)
+        distances = np.concatenate(distances) if distances else np.empty(0, dtype=np.float32)
+
+        profiles.order = np.argsort(labels, kind="stable")
+        profiles.offsets = np.zeros(k + 1, dtype=np.int64)
+        profiles.offsets[1:] = np.cumsum(np.bincount(labels, minlength=k))
+
+        # cluster x skill counts: number of members listing each skill
+        membership = sparse.csr_matrix(
+            (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))), shape=(k, len(labels))
+        )
+        counts = np.asarray((membership @ skills.matrix).todense())
+        profiles.top_skills = []
+        for row in counts:
+            best = np.flatnonzero(row > 0)
+            best = best[np.lexsort((best, -row[best]))][:top_n]
+            profiles.top_skills.append([(skills.display_names[i], int(row[i])) for i in best])
+
+        profiles.representatives = []
+        for cluster in range(k):
+            members = profiles.members(cluster)
+            closest = np.argsort(distances[members], kind="stable")[:n_representatives]
+            profiles.representatives.append(members[closest])
+        return profiles
+
+    @classmethod
+    def load(cls, path):
+        data = joblib.load(path)
+        # Stats saved without "embedded" were built from profile-text embeddings
+        return cls(data["centers"], data["order"], data["offsets"], data["top_skills"],
+                   data["representatives"], data["fingerprint"], data["n_profiles"], data.get("embedded", "text"))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump({
+            "centers": self.centers, "order": self.order, "offsets": self.offsets,
+            "top_skills": self.top_skills, "representatives": self.representatives,
+            "fingerprint": self.fingerprint, "n_profiles": self.n_profiles, "embedded": self.embedded,
+        }, path)
+
+    def __len__(self):
+        return len(self.centers)
+
+    def is_current(self, kmeans, n_profiles):
+        """False once the model was refit, the corpus changed size or the stats predate `embed_skills`."""
+        return (self.fingerprint == model_fingerprint(kmeans) and self.n_profiles == n_profiles
+                and self.embedded == EMBEDDED_FIELD)
+
+    def assign(self, query_embeddings):
+        """(cluster ids, Euclidean distances to their centroid) for a batch of embeddings."""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        squared = (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ self.centers.T + self._center_norms
+        labels = squared.argmin(axis=1)
+        nearest = np.take_along_axis(squared, labels[:, None], axis=1).ravel()
+        return labels, np.sqrt(np.clip(nearest, 0, None))
+
+    def size(self, cluster):
+        return int(self.offsets[cluster + 1] - self.offsets[cluster])
+
+    def members(self, cluster):
+        """Corpus row ids of the cluster's members."""
+        return self.order[self.offsets[cluster]:self.offsets[cluster + 1]]
+
+
+if __name__ == "__main__":
+    from embedding_store import load_store
+    from skill_index import SkillMatrix
+
+    parser = argparse.ArgumentParser(description="Precompute per-cluster stats for a KMeans skill-cluster model.")
+    parser.add_argument("--model", default=CLUSTER_MODEL_FILE)
+    parser.add_argument("--store", default="data/store", help="Embedding store or embeddings.joblib (for its rows)")
+    parser.add_argument("--cache", default="data/embedding_cache.sqlite", help="Embedding cache for skill vectors")
+    parser.add_argument("--output", default=None, help="Defaults to <model>_profiles.joblib")
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--representatives", type=int, default=10)
+    args = parser.parse_args()
+
+    df = load_store(args.store)[0] if os.path.isdir(args.store) else joblib.load(args.store)
+    vectors = embed_skills(df["total_skills"].values, cache_path=args.cache)
+    kmeans = joblib.load(args.model)
+    profiles = ClusterProfiles.build(kmeans, vectors, SkillMatrix.build(df["total_skills"].values),
+                                     top_n=args.top_n, n_representatives=args.representatives)
+    output = args.output or profiles_path(args.model)
+    profiles.save(output)
+
+    for cluster in range(len(profiles)):
+        print(f"\n🔥 Cluster {cluster} — {profiles.size(cluster)} profiles, top skills:")
+        for skill, count in profiles.top_skills[cluster][:10]:
+            print(f"  {skill}: {count}")
+    print(f"\n💾 Saved cluster profiles to {output}")
@@ -0,0 +1,245 @@
+import os
+import csv
+import json
+import zlib
+import argparse
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from json_stream import iter_json_values
+from role_index import normalize_role
+from skill_index import split_skills
+
+# Collapses duplicate profiles before they are embedded: rows that are
+# identical once normalized (e.g. the same scrape under two profile types)
+# and near-duplicates whose skills, position and company overlap almost
+# entirely. Near-duplicates are found with MinHash + LSH banding, so only
+# rows sharing a band are ever compared.
+
+# Fields compared for exact duplicates; profile_type comes from the source
+# file name, so the same profile scraped into two files still matches
+EXACT_FIELDS = [
+    "current_position", "current_company", "years_of_experience", "total_skills", "education_degree",
+    "education_institution", "certifications", "city", "state", "country",
+]
+
+_MERSENNE = (1 << 61) - 1
+
+
+def _clean(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def exact_key(profile):
+    """Normalized EXACT_FIELDS of a profile; equal keys are exact duplicates."""
+    return "\x1f".join(_clean(profile.get(field)) for field in EXACT_FIELDS)
+
+
+def profile_tokens(profile):
+    """Set compared for near-duplicates: normalized skills plus the position and company."""
+    tokens = {f"skill:{s}" for s in split_skills(profile.get("total_skills"))}
+    position = normalize_role(profile.get("current_position"))
+    company = _clean(profile.get("current_company"))
+    if position:
+        tokens.add(f"position:{position}")
+    if company:
+        tokens.add(f"company:{company}")
+    return tokens
+
+
+def lsh_shape(threshold, num_perm):
+    """(bands, rows) splitting `num_perm` hashes so pairs at `threshold` Jaccard almost always collide.
+
+    Picks the highest LSH cut-off (1/bands)**(1/rows) not above `threshold`:
+    missed pairs cannot be recovered, extra candidates are only verified.
+    """
+    shapes = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    below = [shape for shape in shapes if (1 / shape[0]) ** (1 / shape[1]) <= threshold]
+    return max(below or shapes[-1:], key=lambda shape: (1 / shape[0]) ** (1 / shape[1]))
+
+
+class MinHasher:
+    """MinHash signatures of token sets with `num_perm` universal hash functions."""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE, size=num_perm, dtype=np.uint64)
+        self._token_hashes = {}
+
+    def signature(self, tokens):
+        if not tokens:
+            return np.full(len(self.a), 0xFFFFFFFF, dtype=np.uint64)
+        hashes = []
+        for token in tokens:
+            if token not in self._token_hashes:
+                self._token_hashes[token] = zlib.crc32(token.encode("utf-8"))
+            hashes.append(self._token_hashes[token])
+        # Same scheme as datasketch: uint64 wrap-around, then mod the Mersenne prime, kept to 32 bits
+        values = (np.array(hashes, dtype=np.uint64)[:, None] * self.a + self.b) % _MERSENNE
+        return (values & np.uint64(0xFFFFFFFF)).min(axis=0)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def find_duplicates(profiles, threshold=0.85, num_perm=128, seed=1):
+    """Duplicate groups among `profiles` (dicts), as report-ready dicts.
+
+    Each group keeps its first profile in input order. Exact duplicates
+    share an `exact_key`; near-duplicates have `profile_tokens` Jaccard
+    >= `threshold` with another member, checked exactly for every LSH
+    candidate pair. Profiles without skills are only deduplicated exactly.
+    """
+    parent = list(range(len(profiles)))
+    reasons = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j, reason, similarity):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # The earlier row stays the group's representative
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+            reasons[max(root_i, root_j)] = (reason, similarity)
+
+    first_seen = {}
+    for i, profile in enumerate(profiles):
+        key = exact_key(profile)
+        if key in first_seen:
+            union(first_seen[key], i, "exact", 1.0)
+        else:
+            first_seen[key] = i
+
+    # Near-duplicate search over one representative per exact key
+    candidates = sorted(first_seen.values())
+    tokens = {i: profile_tokens(profiles[i]) for i in candidates}
+    candidates = [i for i in candidates if any(t.startswith("skill:") for t in tokens[i])]
+    bands, rows = lsh_shape(threshold, num_perm)
+    hasher = MinHasher(bands * rows, seed)
+    buckets = defaultdict(list)
+    for i in candidates:
+        signature = hasher.signature(tokens[i])
+        for band in range(bands):
+            buckets[band, signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pair = (members[x], members[y])
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                similarity = jaccard(tokens[pair[0]], tokens[pair[1]])
+                if similarity >= threshold:
+                    union(*pair, "near", similarity)
+
+    groups = defaultdict(list)
+    for i in range(len(profiles)):
+        groups[find(i)].append(i)
+    return [
+        {
+            "kept": root,
+            "removed": [
+                {"index": i, "reason": reasons[i][0], "similarity": round(reasons[i][1], 3)}
+                for i in members[1:]
+            ],
+        }
+        for root, members in sorted(groups.items())
+        if len(members) > 1
+    ]
+
+
+def dedup_profiles(profiles, threshold=0.85, num_perm=128, seed=1):
+    """(kept profiles in input order, report) for a list of profile dicts."""
+    groups = find_duplicates(profiles, threshold, num_perm, seed)
+    removed = {r["index"] for g in groups for r in g["removed"]}
+    kept = [p for i, p in enumerate(profiles) if i not in removed]
+
+    reasons = Counter(r["reason"] for g in groups for r in g["removed"])
+    sources = Counter(profiles[r["index"]].get("profile_type", "") for g in groups for r in g["removed"])
+    for group in groups:
+        profile = profiles[group["kept"]]
+        group["profile"] = {f: profile.get(f) for f in ("current_position", "current_company", "profile_type")}
+        for r in group["removed"]:
+            r["profile_type"] = profiles[r["index"]].get("profile_type")
+    report = {
+        "input": len(profiles),
+        "output": len(kept),
+        "exact_removed": reasons["exact"],
+        "near_removed": reasons["near"],
+        "threshold": threshold,
+        "removed_by_profile_type": dict(sources.most_common()),
+        "groups": groups,
+    }
+    return kept, report
+
+
+def read_records(path):
+    """Profile dicts from a CSV (preprocess.py output), JSON array or JSONL file."""
+    if path.endswith(".csv"):
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    records = []
+    for value in iter_json_values(path):
+        if isinstance(value, list):
+            records.extend(value)
+        else:
+            records.append(value)
+    return records
+
+
+def write_records(records, path):
+    """Write profile dicts as CSV, a JSON array (.json) or JSONL, by extension."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            fields = list(dict.fromkeys(k for record in records for k in record))
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+        elif path.endswith(".json"):
+            json.dump(records, f, ensure_ascii=False)
+        else:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def print_summary(report, examples=5):
+    print(f"🧹 {report['input']} profiles -> {report['output']} "
+          f"({report['exact_removed']} exact and {report['near_removed']} near duplicates removed)")
+    for profile_type, count in list(report["removed_by_profile_type"].items())[:10]:
+        print(f"  {profile_type or '(none)'}: {count} removed")
+    for group in sorted(report["groups"], key=lambda g: -len(g["removed"]))[:examples]:
+        profile = group["profile"]
+        print(f"  e.g. {profile['current_position']} @ {profile['current_company']} "
+              f"(row {group['kept']}) absorbed {len(group['removed'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove exact and near-duplicate profiles before embedding.")
+    parser.add_argument("input", nargs="?", default="csv/combined.csv", help="CSV, JSON array or JSONL profiles")
+    parser.add_argument("output", nargs="?", default="csv/combined_dedup.csv", help="Format follows the extension")
+    parser.add_argument("--threshold", type=float, default=0.85,
+                        help="Jaccard similarity of skills + position + company for near duplicates")
+    parser.add_argument("--num-perm", type=int, default=128, help="MinHash functions")
+    parser.add_argument("--report", default=None, help="Write the full JSON report here")
+    args = parser.parse_args()
+
+    kept, report = dedup_profiles(read_records(args.input), args.threshold, args.num_perm)
+    write_records(kept, args.output)
+    print_summary(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📝 Report written to {args.report}")
+    print(f"✅ Wrote {len(kept)} profiles to {args.output}")
@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+
+import numpy as np
+
+import metrics
+from embedding_client import MODEL_NAME
+
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Embedding cache lookups by cache and result")
+
+
+def cache_key(text, model_name=MODEL_NAME):
+    """Content address of an embedding: hash of the model name and the exact text."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent text -> embedding cache in a single SQLite file.
+
+    Vectors are stored as float32 blobs keyed by `cache_key`, with the time
+    each entry was stored (for callers with a TTL) and last used (so stale
+    entries can be compacted away).
+    """
+
+    def __init__(self, path="data/embedding_cache.sqlite", model_name=MODEL_NAME):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.model_name = model_name
+        # Callers that share a cache across threads serialize access themselves
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " created REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(embeddings)")}
+        if "created" not in columns:
+            # Entries from before the column count as infinitely old for a max_age
+            self.conn.execute("ALTER TABLE embeddings ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, texts, max_age=None, with_created=False):
+        """Cached embeddings for `texts` in order, with None for every miss.
+
+        Entries stored more than `max_age` seconds ago count as misses. With
+        `with_created`, hits are (embedding, time stored) pairs.
+        """
+        keys = [cache_key(t, self.model_name) for t in texts]
+        oldest = time.time() - max_age if max_age is not None else float("-inf")
+        found, created = {}, {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, vector, created FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, vector, stored in rows:
+                if stored >= oldest:
+                    found[key] = vector
+                    created[key] = stored
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found]
+            )
+            self.conn.commit()
+
+        results = [
+            np.frombuffer(found[k], dtype=np.float32).tolist() if k in found else None for k in keys
+        ]
+        if with_created:
+            results = [(r, created[k]) if r is not None else None for k, r in zip(keys, results)]
+        hits = sum(r is not None for r in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        CACHE_LOOKUPS.inc(hits, cache=self.name, result="hit")
+        CACHE_LOOKUPS.inc(len(results) - hits, cache=self.name, result="miss")
+        return results
+
+    def put_many(self, texts, embeddings):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used, created) VALUES (?, ?, ?, ?, ?)",
+            [
+                (cache_key(t, self.model_name), len(e), np.asarray(e, dtype=np.float32).tobytes(), now, now)
+                for t, e in zip(texts, embeddings)
+            ],
+        )
+        self.conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": os.path.getsize(self.path),
+        }
+
+    def compact(self, keep_texts=None, older_than_seconds=None):
+        """Drop stale entries and reclaim space; returns the number removed.
+
+        Entries are stale when they are not the embedding of any text in
+        `keep_texts` and/or have not been used for `older_than_seconds`.
+        """
+        removed = 0
+        if keep_texts is not None:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (key TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM keep")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO keep (key) VALUES (?)",
+                [(cache_key(t, self.model_name),) for t in keep_texts],
+            )
+            removed += self.conn.execute(
+                "DELETE FROM embeddings WHERE key NOT IN (SELECT key FROM keep)"
+            ).rowcount
+        if older_than_seconds is not None:
+            removed += self.conn.execute(
+                "DELETE FROM embeddings WHERE last_used < ?", (time.time() - older_than_seconds,)
+            ).rowcount
+        self.conn.commit()
+        self.conn.execute("VACUUM")
+        return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or compact the profile embedding cache.")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--cache", default="data/embedding_cache.sqlite")
+    parser.add_argument("--profiles", default=None, help="Keep only entries for the profiles in this file")
+    parser.add_argument("--older-than-days", type=float, default=None, help="Drop entries unused for this long")
+    args = parser.parse_args()
+
+    with EmbeddingCache(args.cache) as cache:
+        if args.command == "compact":
+            keep_texts = None
+            if args.profiles:
+                from career_embeddings import create_profile_text, read_profiles
+                keep_texts = [create_profile_text(p) for p in read_profiles(args.profiles)]
+            older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+            removed = cache.compact(keep_texts, older_than)
+            print(f"🧹 Removed {removed} stale entries")
+        stats = cache.stats()
+        print(f"📦 {stats['entries']} cached embeddings, {stats['bytes'] / 1e6:.1f} MB")
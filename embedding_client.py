@@ -0,0 +1,195 @@
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# Ollama API setup
+OLLAMA_URL = "http://localhost:11434/api/embed"
+MODEL_NAME = "bge-m3"
+
+# Status codes worth retrying; anything else in 4xx is a caller error
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+EMBED_SECONDS = metrics.histogram("embedding_request_seconds", "Latency of embedding service requests")
+EMBED_REQUESTS = metrics.counter("embedding_requests_total", "Embedding service requests by outcome")
+EMBED_TEXTS = metrics.counter("embedding_texts_total", "Texts embedded by the embedding service")
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when the embedding service keeps failing after all retries."""
+
+
+def _embeddings(response, count):
+    """The `count` vectors of an /api/embed response; InvalidJSONError if the body is not that."""
+    try:
+        embeddings = response.json()["embeddings"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise requests.exceptions.InvalidJSONError(f"Malformed embedding response: {e!r}", response=response) from e
+    if not isinstance(embeddings, list) or len(embeddings) != count:
+        raise requests.exceptions.InvalidJSONError(
+            f"Expected {count} embeddings, got {len(embeddings) if isinstance(embeddings, list) else 'none'}",
+            response=response,
+        )
+    return embeddings
+
+
+class EmbeddingClient:
+    """Pooled, retrying client for Ollama's /api/embed endpoint.
+
+    `embed_many` keeps up to `max_workers` batches in flight and resizes
+    batches so each one takes roughly `target_batch_seconds`, bounded by
+    `min_batch_size`/`max_batch_size` and `max_batch_chars` of payload.
+    Every request is counted in `stats()` instead of being printed, and the
+    last `max_recorded_batches` are kept in `batch_stats`.
+    """
+
+    def __init__(
+        self,
+        url=OLLAMA_URL,
+        model=MODEL_NAME,
+        max_workers=4,
+        batch_size=50,
+        min_batch_size=8,
+        max_batch_size=512,
+        max_batch_chars=200_000,
+        target_batch_seconds=2.0,
+        timeout=60,
+        max_retries=3,
+        backoff=0.5,
+        max_recorded_batches=1000,
+    ):
+        self.url = url
+        self.model = model
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+        self.target_batch_seconds = target_batch_seconds
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.batch_stats = deque(maxlen=max_recorded_batches)
+        self._totals = {"batches": 0, "items": 0, "seconds": 0.0, "retries": 0}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def embed(self, texts):
+        """Embed one batch of texts with bounded retries and exponential backoff."""
+        payload = {"model": self.model, "input": list(texts)}
+        last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                with EMBED_SECONDS.time():
+                    r = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if r.status_code in RETRY_STATUS:
+                    raise requests.HTTPError(f"{r.status_code} from embedding service", response=r)
+                r.raise_for_status()
+                embeddings = _embeddings(r, len(texts))
+            # A malformed 200 body is retried like a server error
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError,
+                    requests.exceptions.InvalidJSONError) as e:
+                status = getattr(e.response, "status_code", None) if isinstance(e, requests.HTTPError) else None
+                if status is not None and status not in RETRY_STATUS:
+                    EMBED_REQUESTS.inc(outcome="rejected")
+                    raise EmbeddingError(f"Embedding request rejected: {e}") from e
+                EMBED_REQUESTS.inc(outcome="failed")
+                last_error = e
+                logger.warning("Embedding attempt %d/%d failed: %s", attempt, self.max_retries, e)
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random()))
+                continue
+
+            EMBED_REQUESTS.inc(outcome="ok")
+            EMBED_TEXTS.inc(len(texts))
+            self._record(len(texts), sum(len(t) for t in texts), time.perf_counter() - start, attempt)
+            return embeddings
+        raise EmbeddingError(f"Embedding failed after {self.max_retries} attempts: {last_error}")
+
+    def embed_many(self, texts, progress=None):
+        """Embed any number of texts with concurrent, adaptively sized batches.
+
+        Results are returned in input order. `progress` (e.g. a tqdm bar) gets
+        `.update(n)` as batches finish.
+        """
+        results = [None] * len(texts)
+        next_start = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = {}
+            while next_start < len(texts) or in_flight:
+                while next_start < len(texts) and len(in_flight) < self.max_workers:
+                    end = self._batch_end(texts, next_start)
+                    # Copy the context so an active trace also sees these requests
+                    future = pool.submit(contextvars.copy_context().run, self.embed, texts[next_start:end])
+                    in_flight[future] = (next_start, end)
+                    next_start = end
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end = in_flight.pop(future)
+                    results[start:end] = future.result()
+                    if progress is not None:
+                        progress.update(end - start)
+        return results
+
+    def _batch_end(self, texts, start):
+        end = min(start + self.batch_size, len(texts))
+        chars = 0
+        for i in range(start, end):
+            chars += len(texts[i])
+            if chars > self.max_batch_chars and i > start:
+                return i
+        return end
+
+    def _record(self, size, chars, seconds, attempts):
+        with self._lock:
+            self.batch_stats.append({"size": size, "chars": chars, "seconds": seconds, "attempts": attempts})
+            self._totals["batches"] += 1
+            self._totals["items"] += size
+            self._totals["seconds"] += seconds
+            self._totals["retries"] += attempts - 1
+            # Steer towards target_batch_seconds per request from observed per-item latency
+            per_item = seconds / max(size, 1)
+            if per_item > 0:
+                wanted = self.target_batch_seconds / per_item
+                smoothed = 0.5 * self.batch_size + 0.5 * wanted
+                self.batch_size = int(min(self.max_batch_size, max(self.min_batch_size, smoothed)))
+        logger.debug("Embedded batch of %d items in %.2fs (attempt %d)", size, seconds, attempts)
+
+    def stats(self):
+        """Totals over every recorded batch: count, items, total/mean seconds, retries."""
+        with self._lock:
+            totals = dict(self._totals)
+        return {
+            "batches": totals["batches"],
+            "items": totals["items"],
+            "seconds": totals["seconds"],
+            "mean_batch_seconds": totals["seconds"] / totals["batches"] if totals["batches"] else 0.0,
+            "retries": totals["retries"],
+            "batch_size": self.batch_size,
+        }
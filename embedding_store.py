@@ -0,0 +1,107 @@
+import os
+import json
+import argparse
+
+import joblib
+import numpy as np
+
+from filter_index import FilterIndex
+from lexical_index import LexicalIndex
+from role_index import RoleIndex
+from skill_index import SkillMatrix
+
+# On-disk layout of an embedding store directory:
+#   embeddings.npy  - contiguous (n, dim) matrix of unit-normalized vectors
+#   metadata.joblib - every non-embedding column as a DataFrame (columnar)
+#   manifest.json   - count, dim, dtype and column names
+#   roles.joblib    - normalized role vocabulary and per-profile role codes
+#   filters.joblib  - posting lists for location/profile type/degree/experience filters
+#   lexical.joblib  - BM25 inverted index from skills to profiles
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.joblib"
+MANIFEST_FILE = "manifest.json"
+ROLES_FILE = "roles.joblib"
+FILTERS_FILE = "filters.joblib"
+LEXICAL_FILE = "lexical.joblib"
+
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+def write_store(df, store_path="data/store", dtype="float32", model_name="bge-m3", chunk_size=4096,
+                embeddings=None):
+    """Write a DataFrame with an `embedding` column as a memory-mappable store.
+
+    Vectors are normalized and copied chunk by chunk straight into the
+    output file, so the full matrix is never held in memory twice.
+    `embeddings` may be given instead of the column: anything supporting
+    len() and slicing into rows, such as an array or a lazy generator.
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype!r}")
+
+    os.makedirs(store_path, exist_ok=True)
+    if embeddings is None:
+        embeddings = df["embedding"].values
+    count = len(embeddings)
+    dim = len(embeddings[0]) if count else 0
+
+    matrix = np.lib.format.open_memmap(
+        os.path.join(store_path, EMBEDDINGS_FILE), mode="w+", dtype=dtype, shape=(count, dim)
+    )
+    for start in range(0, count, chunk_size):
+        block = np.asarray(list(embeddings[start:start + chunk_size]), dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix[start:start + len(block)] = block / norms
+    matrix.flush()
+    del matrix
+
+    metadata = df.drop(columns=["embedding"], errors="ignore").reset_index(drop=True)
+    joblib.dump(metadata, os.path.join(store_path, METADATA_FILE))
+    RoleIndex.build(metadata["current_position"].values).save(os.path.join(store_path, ROLES_FILE))
+    FilterIndex.build(metadata).save(os.path.join(store_path, FILTERS_FILE))
+    skills = SkillMatrix.build(metadata["total_skills"].values)
+    LexicalIndex.from_skill_matrix(skills).save(os.path.join(store_path, LEXICAL_FILE))
+
+    manifest = {
+        "count": count,
+        "dim": dim,
+        "dtype": dtype,
+        "normalized": True,
+        "model": model_name,
+        "columns": list(metadata.columns),
+    }
+    with open(os.path.join(store_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(store_path="data/store"):
+    with open(os.path.join(store_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_store(store_path="data/store", mmap=True):
+    """Open a store written by `write_store`.
+
+    Returns (metadata DataFrame, embedding matrix, manifest). With `mmap`
+    the matrix is a read-only view of the file, shared through the page
+    cache by every process that opens the same store.
+    """
+    manifest = load_manifest(store_path)
+    vectors = np.load(os.path.join(store_path, EMBEDDINGS_FILE), mmap_mode="r" if mmap else None)
+    metadata = joblib.load(os.path.join(store_path, METADATA_FILE))
+    if vectors.shape != (manifest["count"], manifest["dim"]) or len(metadata) != manifest["count"]:
+        raise ValueError(f"Embedding store at {store_path} is inconsistent with its manifest")
+    return metadata, vectors, manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a pickled embeddings DataFrame into an embedding store.")
+    parser.add_argument("source", nargs="?", default="data/embeddings.joblib")
+    parser.add_argument("store", nargs="?", default="data/store")
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default="float32")
+    args = parser.parse_args()
+
+    manifest = write_store(joblib.load(args.source), args.store, dtype=args.dtype)
+    print(f"✅ Wrote {manifest['count']} x {manifest['dim']} {manifest['dtype']} vectors to {args.store}")
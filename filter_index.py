@@ -0,0 +1,288 @@
+import re
+import unicodedata
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Categorical columns that can be filtered on, and the year column used for
+# range filters. Values are matched after normalization, so "bangalore",
+# "Bengaluru " and "BENGALURU" all select the same rows.
+CATEGORICAL_FIELDS = ("city", "state", "country", "profile_type", "education_degree", "education_level")
+RANGE_FIELD = "years_of_experience"
+
+CITY_ALIASES = {
+    "bangalore": "bengaluru",
+    "bombay": "mumbai",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "gurgaon": "gurugram",
+    "new delhi": "delhi",
+    "poona": "pune",
+}
+
+COUNTRY_ALIASES = {
+    "usa": "united states",
+    "us": "united states",
+    "united states of america": "united states",
+    "uk": "united kingdom",
+}
+
+# Canonical profile types and the spellings that map to them: source file
+# names (preprocess.py), readable forms and the profile-type classifier's
+# labels (profile_classifier.PROFILE_TYPE_MAPPING)
+PROFILE_TYPES = {
+    "ml_engineer": ("ml_engineers", "ml_eng"),
+    "mlops_engineer": ("mlops", "mlopss", "mlops_eng"),
+    "data_scientist": ("data_scientists", "ds"),
+    "data_analyst": ("data_analysts", "da"),
+    "data_engineer": ("data_engineers",),
+    "business_analyst": ("business_analysts", "ba"),
+    "bi_developer": ("businees_intelligence_developerss", "business_intelligence_developer", "bi_dev"),
+    "backend_developer": ("backend", "backend_dev"),
+    "frontend_developer": ("frontend", "frontend_dev"),
+    "fullstack_developer": ("fullstack", "fullstack_dev"),
+    "mobile_developer": ("mobiledev", "mobile_dev"),
+    "blockchain_developer": ("blockchain_developers", "blockchain_dev"),
+    "web3_developer": ("web3_developers", "web3_dev"),
+    "security_analyst": ("security_analysts",),
+}
+PROFILE_TYPE_ALIASES = {alias: name for name, aliases in PROFILE_TYPES.items() for alias in (name,) + aliases}
+
+# (canonical degree, level, pattern) checked in order against a lowercased degree
+DEGREES = [
+    ("phd", "doctorate", r"\bph\.?\s*d\b|doctor of philosophy|\bdoctorate\b"),
+    ("mtech", "master", r"\bm\.?\s*-?\s*tech\b|master of technology"),
+    ("mca", "master", r"\bm\.?\s*c\.?\s*a\b|master of computer applications?"),
+    ("mba", "master", r"\bm\.?\s*b\.?\s*a\b|master of business administration|\bpgdm\b"),
+    ("msc", "master", r"\bm\.?\s*sc\b|\bm\.?\s*s\b|master of science"),
+    ("me", "master", r"\bm\.?\s*e\b|master of engineering"),
+    ("btech", "bachelor", r"\bb\.?\s*-?\s*tech\b|bachelor of technology"),
+    ("be", "bachelor", r"\bb\.?\s*e\b|bachelor of engineering|engineer.s degree"),
+    ("bca", "bachelor", r"\bb\.?\s*c\.?\s*a\b|bachelor of computer applications?"),
+    ("bba", "bachelor", r"\bb\.?\s*b\.?\s*a\b|bachelor of business administration"),
+    ("bcom", "bachelor", r"\bb\.?\s*com\b|bachelor of commerce"),
+    ("bsc", "bachelor", r"\bb\.?\s*sc\b|\bb\.?\s*s\b|bachelor of science"),
+    ("ba", "bachelor", r"\bb\.?\s*a\b|bachelor of arts"),
+    ("diploma", "diploma", r"\bdiploma\b"),
+    ("master", "master", r"\bmaster|\bpost\s*-?\s*graduat|\bpg[a-z]{0,3}\b"),
+    ("bachelor", "bachelor", r"\bbachelor|\bundergraduate\b"),
+]
+DEGREE_PATTERNS = [(degree, level, re.compile(pattern)) for degree, level, pattern in DEGREES]
+
+
+def _fold(value):
+    """Lowercase, accent-free, single-spaced text ("Hyderābād " -> "hyderabad")."""
+    if not isinstance(value, str):
+        return ""
+    value = unicodedata.normalize("NFKD", value.replace("’", "'"))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", value.lower()).strip()
+
+
+def normalize_place(value, aliases=None):
+    place = _fold(value)
+    return (aliases or {}).get(place, place)
+
+
+def normalize_profile_type(value):
+    """Canonical profile type ("backendFinal" and "Backend_Dev" -> "backend_developer").
+
+    Types missing from PROFILE_TYPES are kept as cleaned, without a "final" suffix.
+    """
+    value = re.sub(r"[^a-z0-9]+", "_", _fold(value))
+    value = re.sub(r"_?finals?(?=_|$)", "", value).strip("_")
+    return PROFILE_TYPE_ALIASES.get(value, value)
+
+
+def classify_degree(value):
+    """(canonical degree, level) for a free-text degree, e.g. "B.Tech" -> ("btech", "bachelor")."""
+    text = _fold(value)
+    if not text:
+        return "", ""
+    for degree, level, pattern in DEGREE_PATTERNS:
+        if pattern.search(text):
+            return degree, level
+    return text, ""
+
+
+NORMALIZERS = {
+    "city": lambda v: normalize_place(v, CITY_ALIASES),
+    "state": normalize_place,
+    "country": lambda v: normalize_place(v, COUNTRY_ALIASES),
+    "profile_type": normalize_profile_type,
+    "education_degree": lambda v: classify_degree(v)[0],
+    "education_level": lambda v: classify_degree(v)[1] or _fold(v),
+}
+
+
+def _posting_lists(keys, codes):
+    """Rows grouped by code for one categorical field."""
+    order = np.argsort(codes, kind="stable").astype(np.int64)
+    # Blank values (code -1) sort first and are never selected
+    order = order[np.count_nonzero(codes < 0):]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(keys)))])
+    return {"keys": keys, "codes": codes, "order": order, "offsets": offsets}
+
+
+class FilterIndex:
+    """Posting lists over profile metadata, used to restrict search before top-k.
+
+    Every categorical field is integer-coded per profile with its rows
+    grouped by code (`order[offsets[c]:offsets[c + 1]]` are the rows with
+    code `c`); years of experience are kept sorted for range lookups.
+    `select` starts from the most selective clause and checks the others
+    against the per-row codes of just those candidates.
+    """
+
+    def __init__(self, fields, years, years_order):
+        self.fields = fields  # name -> {"keys", "codes", "order", "offsets"}
+        self.years = years
+        self.years_order = years_order
+
+    @classmethod
+    def build(cls, df):
+        fields = {}
+        for name in CATEGORICAL_FIELDS:
+            column = "education_degree" if name == "education_level" else name
+            if column not in df:
+                continue
+            normalize = NORMALIZERS[name]
+            normalized = {}
+            row_keys = []
+            for value in df[column].values:
+                if value not in normalized:
+                    normalized[value] = normalize(value)
+                row_keys.append(normalized[value])
+            keys = sorted({k for k in row_keys if k})
+            code_of = {k: i for i, k in enumerate(keys)}
+            fields[name] = _posting_lists(keys, np.array([code_of.get(k, -1) for k in row_keys], dtype=np.int32))
+
+        if RANGE_FIELD in df:
+            # Blank or unparseable years become NaN and never match a range
+            years = pd.to_numeric(df[RANGE_FIELD], errors="coerce").to_numpy(dtype=np.float32)
+        else:
+            years = np.full(len(df), np.nan, dtype=np.float32)
+        years_order = np.argsort(years, kind="stable").astype(np.int64)  # NaN sorts last
+        return cls(fields, years, years_order)
+
+    def with_rows(self, df):
+        """Copy of the index with the rows of `df` appended after the existing ones."""
+        added = FilterIndex.build(df)
+        fields = {}
+        for name in [n for n in CATEGORICAL_FIELDS if n in self.fields or n in added.fields]:
+            parts = [(index.fields.get(name), len(index)) for index in (self, added)]
+            keys = sorted({k for field, _ in parts if field for k in field["keys"]})
+            code_of = {k: i for i, k in enumerate(keys)}
+            codes = []
+            for field, count in parts:
+                if field is None:
+                    codes.append(np.full(count, -1, dtype=np.int32))
+                else:
+                    # The trailing -1 keeps blank rows (code -1) blank
+                    remap = np.array([code_of[k] for k in field["keys"]] + [-1], dtype=np.int32)
+                    codes.append(remap[field["codes"]])
+            fields[name] = _posting_lists(keys, np.concatenate(codes))
+        years = np.concatenate([self.years, added.years])
+        return FilterIndex(fields, years, np.argsort(years, kind="stable").astype(np.int64))
+
+    @classmethod
+    def load(cls, path):
+        data = joblib.load(path)
+        return cls(data["fields"], data["years"], data["years_order"])
+
+    def save(self, path):
+        joblib.dump({"fields": self.fields, "years": self.years, "years_order": self.years_order}, path)
+
+    def __len__(self):
+        return len(self.years)
+
+    def values(self, name):
+        """Normalized values available for a categorical field."""
+        return list(self.fields[name]["keys"])
+
+    def select(self, filters):
+        """Sorted row ids matching every clause of `filters`, or None for no filter.
+
+        `filters` maps a field to one value or a list of values (any may
+        match); `years_of_experience` takes a (min, max) pair where either
+        end may be None. Example:
+        {"city": "Bangalore", "profile_type": "ml_engineer", "years_of_experience": (3, 6)}
+        """
+        if not filters:
+            return None
+        self.validate(filters)
+        clauses = []
+        for name, wanted in filters.items():
+            if wanted is None:
+                continue
+            if name == RANGE_FIELD:
+                clauses.append(self._range_clause(*wanted))
+            else:
+                clauses.append(self._categorical_clause(name, wanted))
+        if not clauses:
+            return None
+
+        clauses.sort(key=lambda c: c[0])
+        _, postings, _ = clauses[0]
+        ids = postings()
+        for _, _, matches in clauses[1:]:
+            if not len(ids):
+                break
+            ids = ids[matches(ids)]
+        return np.sort(ids)
+
+    def validate(self, filters):
+        """Raise ValueError for a malformed `filters` dict (unknown field, bad range or value)."""
+        if not isinstance(filters, dict):
+            raise ValueError("filters must be a mapping of field to value(s)")
+        for name, wanted in filters.items():
+            if wanted is None:
+                continue
+            if name in self.fields:
+                values = [wanted] if isinstance(wanted, str) else wanted
+                if not isinstance(values, (list, tuple)) or not all(isinstance(v, str) for v in values):
+                    raise ValueError(f"{name} takes a string or a list of strings")
+            elif name == RANGE_FIELD:
+                if not isinstance(wanted, (list, tuple)) or len(wanted) != 2:
+                    raise ValueError(f"{RANGE_FIELD} takes a (min, max) pair")
+                for bound in wanted:
+                    if bound is not None and not isinstance(bound, (int, float)):
+                        raise ValueError(f"{RANGE_FIELD} bounds must be numbers or None")
+            elif name in CATEGORICAL_FIELDS:
+                raise ValueError(f"Field {name!r} is not indexed for this corpus")
+            else:
+                raise ValueError(f"Cannot filter on {name!r}; use one of {CATEGORICAL_FIELDS + (RANGE_FIELD,)}")
+
+    def _categorical_clause(self, name, wanted):
+        field = self.fields[name]
+        normalize = NORMALIZERS[name]
+        wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+        code_of = {k: i for i, k in enumerate(field["keys"])}
+        codes = np.array(sorted({code_of[k] for k in map(normalize, wanted) if k in code_of}), dtype=np.int32)
+        offsets, order = field["offsets"], field["order"]
+        size = int(np.sum(offsets[codes + 1] - offsets[codes]))
+
+        def postings():
+            return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in codes] or [np.empty(0, np.int64)])
+
+        return size, postings, lambda ids: np.isin(field["codes"][ids], codes)
+
+    def _range_clause(self, low=None, high=None):
+        sorted_years = self.years[self.years_order]
+        start = 0 if low is None else int(np.searchsorted(sorted_years, low, side="left"))
+        stop = np.count_nonzero(~np.isnan(sorted_years)) if high is None else int(
+            np.searchsorted(sorted_years, high, side="right")
+        )
+        stop = max(start, stop)
+
+        def matches(ids):
+            years = self.years[ids]
+            keep = ~np.isnan(years)
+            if low is not None:
+                keep &= years >= low
+            if high is not None:
+                keep &= years <= high
+            return keep
+
+        return stop - start, lambda: self.years_order[start:stop], matches
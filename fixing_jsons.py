@@ -1,27 +1,63 @@
+import sys
 import json
+import argparse
 
-# # Load your JSON (example with file)
-# with open("json/businees_intelligence_developers.json", "r", encoding="utf-8") as f:
-#     data = json.load(f)
+from json_stream import iter_json_values
 
-# # Check if the first element is a list (extra nesting)
-# if isinstance(data[0], list):
-#     data = data[0]  # flatten it
+# Repairs scraped dumps that are concatenated JSON objects (with or without
+# commas/newlines between them), newline-delimited JSON, or an array whose
+# first element is an extra nested list. Objects are streamed one at a time,
+# so inputs of any size work, and malformed objects are reported by offset
+# instead of aborting the run.
 
-# # Now 'data' has the same structure as your first JSON
-# with open("json/businees_intelligence_developerss.json", "w", encoding="utf-8") as f:
-#     json.dump(data, f, indent=2, ensure_ascii=False)
 
+def iter_objects(input_path, on_error=None):
+    """Stream objects from `input_path`, flattening one level of list nesting."""
+    for value in iter_json_values(input_path, on_error=on_error):
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
 
-# Read file with multiple objects (even without commas)
-with open("json/combined_output.json", "r") as f:
-    text = f.read()
 
-# Fix: insert commas and wrap with brackets if needed
-# Split by '}\n{' pattern
-objects = text.strip().replace("}\n{", "}|SPLIT|{").split("|SPLIT|")
-data = [json.loads(obj) for obj in objects]
+def repair(input_path, output_path, output_format="jsonl"):
+    """Rewrite `input_path` as JSONL or a compact JSON array.
 
-# Save as valid JSON array
-with open("combined.json", "w") as f:
-    json.dump(data, f, indent=2)
+    Returns (objects written, list of (offset, message) for malformed objects).
+    """
+    errors = []
+
+    def report(offset, message):
+        errors.append((offset, message))
+        print(f"⚠️ Skipping malformed object at offset {offset}: {message}", file=sys.stderr)
+
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        if output_format == "array":
+            out.write("[")
+        for obj in iter_objects(input_path, on_error=report):
+            line = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+            if output_format == "array":
+                out.write(",\n" if count else "\n")
+                out.write(line)
+            else:
+                out.write(line + "\n")
+            count += 1
+        if output_format == "array":
+            out.write("\n]\n")
+    return count, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream-repair concatenated JSON into JSONL or a compact array.")
+    parser.add_argument("input", nargs="?", default="json/combined_output.json")
+    parser.add_argument("output", nargs="?", default="combined.json")
+    parser.add_argument(
+        "--format", choices=["jsonl", "array"], default=None,
+        help="Output format (default: array for .json outputs, otherwise jsonl)",
+    )
+    args = parser.parse_args()
+
+    output_format = args.format or ("array" if args.output.endswith(".json") else "jsonl")
+    count, errors = repair(args.input, args.output, output_format)
+    print(f"✅ Wrote {count} objects to {args.output} ({len(errors)} malformed skipped)")
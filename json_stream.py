@@ -0,0 +1,104 @@
+import re
+import json
+
+CHUNK_SIZE = 1 << 20
+MAX_VALUE_CHARS = 64 << 20
+WHITESPACE = " \t\r\n"
+
+# Where the next object probably starts after a malformed one: a "{" that
+# opens a line or directly follows a closing "}"
+RESYNC = re.compile(r"(?:\n|\})\s*,?\s*(\{)")
+
+
+def _is_truncated(err, buf):
+    """Whether a decode error looks like the value simply continues past the buffer."""
+    return err.msg.startswith("Unterminated string") or err.pos >= len(buf) - 8
+
+
+def iter_json_values(file_path, chunk_size=CHUNK_SIZE, on_error=None, max_value_chars=MAX_VALUE_CHARS):
+    """Yield top-level JSON values one at a time with bounded memory.
+
+    Accepts a JSON array (yields its elements), concatenated objects (with
+    or without a comma between them) and newline-delimited JSON. Only the current value plus one read chunk is
+    buffered, never the whole file.
+
+    Malformed values raise json.JSONDecodeError unless `on_error` is given,
+    in which case it is called as `on_error(offset, message)` with the
+    character offset of the bad value, and decoding resumes at the next
+    object.
+    """
+    decoder = json.JSONDecoder()
+    # newline="" keeps reported offsets aligned with the file's characters
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        buf = ""
+        pos = 0
+        base = 0  # characters discarded before buf[0]
+        eof = False
+        started = False
+        in_array = False
+        separated = True  # a "," between top-level values was already skipped
+
+        def read_more():
+            nonlocal buf, pos, base, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            base += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        while True:
+            # Skip whitespace, the opening bracket and separators between values
+            while pos < len(buf):
+                ch = buf[pos]
+                if ch in WHITESPACE or (in_array and ch == ","):
+                    pos += 1
+                elif ch == "," and not separated:
+                    # Concatenated objects may be separated by single commas
+                    separated = True
+                    pos += 1
+                elif not started and ch == "[":
+                    started = in_array = True
+                    pos += 1
+                elif in_array and ch == "]":
+                    return
+                else:
+                    started = True
+                    break
+
+            if pos >= len(buf):
+                if eof:
+                    return
+                read_more()
+                continue
+
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as err:
+                if not eof and _is_truncated(err, buf) and len(buf) - pos < max_value_chars:
+                    read_more()
+                    continue
+                if on_error is None:
+                    raise json.JSONDecodeError(f"{err.msg} (file offset {base + err.pos})", err.doc, err.pos) from None
+                on_error(base + pos, f"{err.msg} (offset {base + err.pos})")
+
+                # Resume at the next plausible object start, reading ahead if needed
+                while True:
+                    match = RESYNC.search(buf, pos + 1)
+                    if match:
+                        pos = match.start(1)
+                        break
+                    if eof:
+                        return
+                    # Keep one character so a "}" or "\n" before the next "{" still matches
+                    pos = max(pos, len(buf) - 1)
+                    read_more()
+                continue
+
+            # A value touching the end of the buffer may be truncated (e.g. a number)
+            if end == len(buf) and not eof:
+                read_more()
+                continue
+
+            yield value
+            pos = end
+            separated = False
@@ -0,0 +1,95 @@
+import joblib
+import numpy as np
+from scipy import sparse
+
+from skill_index import normalize_skill, split_skills
+
+
+def top_scores(scores, top_k, ids=None):
+    """(indices, scores) of the `top_k` positive entries of `scores`, best first.
+
+    `ids`, if given, restricts the result to those positions.
+    """
+    if ids is not None:
+        allowed = np.zeros(len(scores), dtype=bool)
+        allowed[ids] = True
+        scores = np.where(allowed, scores, 0)
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > top_k:
+        candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order], scores[candidates[order]]
+
+
+class LexicalIndex:
+    """BM25 inverted index from normalized skills to the profiles listing them.
+
+    `postings` is a skill x profile CSR matrix whose row for a skill holds
+    the BM25 weight of that skill in every profile that has it, so scoring
+    a query only touches the posting lists of its own skills. Skills are
+    matched after the same normalization as SkillMatrix ("Python
+    (Programming Language)" and "py" are both "python").
+    """
+
+    def __init__(self, postings, vocab, k1=1.2, b=0.75):
+        self.postings = postings
+        self.vocab = vocab
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def from_skill_matrix(cls, skills, k1=1.2, b=0.75, live=None):
+        """Weight a SkillMatrix's profile x skill incidence with BM25.
+
+        `live` (row ids) limits the corpus statistics to those profiles; the
+        other rows keep their position but get no weight, so they never match.
+        """
+        matrix = skills.matrix.tocsr()
+        if live is not None:
+            keep = np.zeros(matrix.shape[0], dtype=np.float32)
+            keep[live] = 1.0
+            matrix = (sparse.diags(keep) @ matrix).tocsr()
+            matrix.eliminate_zeros()
+        n_profiles = matrix.shape[0] if live is None else len(live)
+        doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = np.log1p((n_profiles - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        # Every skill appears at most once per profile, so tf is 1 and only
+        # the profile-length normalization varies within a posting list
+        lengths = np.diff(matrix.indptr).astype(np.float32)
+        avg_length = lengths.sum() / n_profiles if n_profiles else 1.0
+        norm = (k1 + 1) / (1 + k1 * (1 - b + b * lengths / max(avg_length, 1e-9)))
+        weights = matrix.copy().astype(np.float32)
+        weights.data = idf[weights.indices] * np.repeat(norm, np.diff(weights.indptr))
+        return cls(weights.T.tocsr(), skills.vocab, k1=k1, b=b)
+
+    @classmethod
+    def load(cls, path):
+        data = joblib.load(path)
+        return cls(data["postings"], data["vocab"], k1=data["k1"], b=data["b"])
+
+    def save(self, path):
+        joblib.dump({"postings": self.postings, "vocab": self.vocab, "k1": self.k1, "b": self.b}, path)
+
+    def __len__(self):
+        return self.postings.shape[1]
+
+    def skill_ids(self, skills):
+        """Vocabulary ids of a comma separated skill string or an iterable of skills."""
+        names = split_skills(skills) if isinstance(skills, str) else [normalize_skill(s) for s in skills]
+        return sorted({self.vocab[s] for s in names if s in self.vocab})
+
+    def score(self, skills):
+        """BM25 score of every profile for the query skills (zero when nothing matches)."""
+        ids = self.skill_ids(skills)
+        if not ids:
+            return np.zeros(len(self), dtype=np.float32)
+        return np.asarray(self.postings[ids].sum(axis=0), dtype=np.float32).ravel()
+
+    def search(self, skills, top_k=10, ids=None):
+        """(indices, scores) of the `top_k` best matching profiles, best first.
+
+        Only profiles matching at least one skill are returned, so there may
+        be fewer than `top_k`. `ids` restricts results to those row ids.
+        """
+        return top_scores(self.score(skills), top_k, ids)
@@ -0,0 +1,154 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from career_embeddings import create_profile_text
+from embedding_client import EmbeddingClient
+from embedding_store import write_store
+from query_cache import QueryEmbeddingCache
+from recommender import CareerRecommender
+from server import RecommendationService, load_recommender
+from stub_embed_server import start_stub_server, stub_embedding
+
+# Drives the HTTP service with concurrent keep-alive clients against a local
+# stub embedding server and reports throughput and latency percentiles.
+
+
+def build_synthetic_store(csv_path, store_path, dim):
+    """Embedding store for the profiles in `csv_path`, embedded with the stub model."""
+    df = pd.read_csv(csv_path).fillna("")
+    df["text"] = [create_profile_text(p) for p in df.to_dict("records")]
+    df["embedding"] = [stub_embedding(t, dim) for t in df["text"]]
+    write_store(df, store_path, model_name="stub")
+    return df
+
+
+def sample_queries(total_skills, n, rng):
+    """Random 3-6 skill subsets of corpus profiles, shuffled and re-cased."""
+    pools = [[s.strip() for s in t.split(",") if s.strip()] for t in total_skills if t]
+    queries = []
+    for _ in range(n):
+        pool = pools[rng.randrange(len(pools))]
+        picked = rng.sample(pool, min(len(pool), rng.randint(3, 6)))
+        queries.append(",".join(s.upper() if rng.random() < 0.2 else s for s in picked))
+    return queries
+
+
+async def _client(port, queries, deadline, latencies, statuses, rng):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            body = json.dumps({"skills": rng.choice(queries), "top_k": 10}).encode("utf-8")
+            start = time.perf_counter()
+            writer.write(
+                b"POST /recommend HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def _drive(port, queries, concurrency, duration, seed):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client(port, queries, deadline, latencies, statuses, random.Random(seed + i))
+        for i in range(concurrency)
+    ])
+    return latencies, statuses, time.perf_counter() - start
+
+
+def run_load_test(recommender, embed_url, concurrency=32, duration=10.0, window_ms=5.0, max_batch=64,
+                  n_queries=500, seed=0):
+    """Start the service in-process, drive it, and return a summary dict."""
+    client = EmbeddingClient(embed_url, max_workers=4, timeout=5, max_retries=2)
+    embedder = QueryEmbeddingCache(client)
+    service = RecommendationService(recommender, embedder, window_ms=window_ms, max_batch=max_batch)
+
+    ready = threading.Event()
+    port_box = []
+
+    def on_ready(port):
+        port_box.append(port)
+        ready.set()
+
+    threading.Thread(target=lambda: asyncio.run(service.serve("127.0.0.1", 0, on_ready)), daemon=True).start()
+    ready.wait()
+
+    queries = sample_queries(recommender.df["total_skills"].tolist(), n_queries, random.Random(seed))
+    latencies, statuses, elapsed = asyncio.run(_drive(port_box[0], queries, concurrency, duration, seed))
+
+    ms = np.array(latencies) * 1000
+    batches = service.batcher.stats()
+    return {
+        "requests": len(latencies),
+        "statuses": statuses,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "mean_batch_size": batches["mean_batch_size"],
+        "embedding_calls": client.stats()["batches"],
+        "query_cache": embedder.stats(),
+        "concurrency": concurrency,
+        "window_ms": window_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the recommendation service against a stub embedder.")
+    parser.add_argument("--store", default=None, help="Existing store; default builds one from --csv")
+    parser.add_argument("--csv", default="csv/combined.csv")
+    parser.add_argument("--dim", type=int, default=1024, help="Stub embedding dimension")
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0, help="Stub per-request latency")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if args.store:
+        recommender = load_recommender(args.store)
+        dim = recommender.index.dim
+    else:
+        store_path = tempfile.mkdtemp(prefix="loadtest_store_")
+        build_synthetic_store(args.csv, store_path, args.dim)
+        recommender = CareerRecommender.from_store(store_path)
+        dim = args.dim
+
+    _, embed_url = start_stub_server(dim=dim, latency_ms=args.embed_latency_ms)
+    summary = run_load_test(
+        recommender, embed_url, concurrency=args.concurrency, duration=args.duration,
+        window_ms=args.window_ms, max_batch=args.max_batch,
+    )
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"📈 {summary['requests']} requests in {summary['seconds']:.1f}s "
+              f"→ {summary['throughput_rps']:.0f} req/s")
+        print(f"⏱️ p50 {summary['p50_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms")
+        print(f"📦 mean batch {summary['mean_batch_size']:.1f}, {summary['embedding_calls']} embedding calls, "
+              f"query cache hit rate {summary['query_cache']['hit_rate']:.0%}")
+        print(f"Statuses: {summary['statuses']}")
@@ -1,30 +1,43 @@
 from recommender import CareerRecommender
-import requests
+from embedding_cache import EmbeddingCache
+from embedding_client import EmbeddingClient, EmbeddingError
+from query_cache import QueryEmbeddingCache
+import os
+
+client = EmbeddingClient(max_workers=1, timeout=10)
+query_cache = QueryEmbeddingCache(client, disk_cache=EmbeddingCache("data/query_cache.sqlite"))
 
 def embed_query(text):
-    r = requests.post(
-        "http://localhost:11434/api/embed",
-        json={"model": "bge-m3", "input": [text]}
-    )
-    return r.json()["embeddings"][0]
+    return query_cache.embed(text)
 
 # Example user input
 user_input = "java,javascript,html,css,reactjs".strip().lower()
-query_emb = embed_query(user_input)
+try:
+    query_emb = embed_query(user_input)
+except EmbeddingError as e:
+    # Fall back to matching skills against the BM25 index
+    print(f"⚠️ Embedding error, using skill matching only: {e}")
+    query_emb = None
+
+if os.path.isdir("data/store"):
+    recommender = CareerRecommender.from_store("data/store")
+else:
+    recommender = CareerRecommender("data/embeddings.joblib")
 
-recommender = CareerRecommender("data/embeddings.joblib")
+# One similarity search shared by profiles, roles and skills
+result = recommender.recommend(query_emb, user_skills=user_input)
 
 # Find similar profiles
 print("🧭 Similar Profiles:")
-print(recommender.find_similar_profiles(query_emb))
+print(result["profiles"])
 
 # Recommend career roles
 print("\n🎯 Recommended Roles:")
-print(recommender.recommend_roles(query_emb))
+print(result["roles"])
 
 # Recommend skills
 print("\n💡 Suggested Skills:")
-print(recommender.recommend_skills(query_emb))
+print(result["skills"])
 
 # import joblib
 # import requests
@@ -1,14 +1,28 @@
-import json
 import csv
 import re
 import os
+import shutil
+import argparse
+import tempfile
 from datetime import datetime
+from multiprocessing import Pool
 
-# Directory containing JSON files
-json_dir = "json"
+from json_stream import iter_json_values
+
+CSV_COLUMNS = [
+    "current_position",
+    "current_company",
+    "years_of_experience",
+    "total_skills",
+    "education_degree",
+    "education_institution",
+    "certifications",
+    "city",
+    "state",
+    "country",
+    "profile_type"  # Adding profile type based on JSON filename
+]
 
-# Get all JSON files in the directory
-json_files = [f for f in os.listdir(json_dir) if f.endswith('.json')]
 
 # Function to convert duration text (e.g., "3 yrs 1 mo") into months
 def parse_duration_text(duration):
@@ -56,91 +70,138 @@ def calculate_years_of_experience(experience_list):
 
     return round(total_months / 12, 1) if total_months > 0 else ""
 
-# Process each JSON file
-for json_file in json_files:
-    print(f"Processing {json_file}...")
-    
-    # Create output CSV filename
-    output_csv = f"csv/{os.path.splitext(json_file)[0]}.csv"
-    
-    # Load JSON data
-    with open(os.path.join(json_dir, json_file), "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Create csv directory if it doesn't exist
-    os.makedirs("csv", exist_ok=True)
-
-    # Prepare CSV
+
+def get_profile_type(json_file):
+    """Profile type from the filename (e.g. "blockchain_developer" from "blockchain_developer_final.json")."""
+    return os.path.splitext(os.path.basename(json_file))[0].replace("_final", "")
+
+
+def profile_to_row(profile, profile_type):
+    """Flatten one scraped profile into a CSV row in CSV_COLUMNS order."""
+    element = profile.get("element", {})
+
+    # Current position & company
+    current_position = ""
+    current_company = ""
+    if element.get("experience"):
+        current_position = element["experience"][0].get("position", "")
+    if element.get("currentPosition"):
+        current_company = element["currentPosition"][0].get("companyName", "")
+
+    # Years of experience
+    years_exp = calculate_years_of_experience(element.get("experience", []))
+
+    # Skills
+    skills = [s.get("name") for s in element.get("skills", []) if s.get("name")]
+    skills_str = ", ".join(skills)
+
+    # Education (highest degree)
+    education_degree = ""
+    education_institution = ""
+    if element.get("education"):
+        edu = element["education"][0]
+        education_degree = edu.get("degree", "")
+        education_institution = edu.get("schoolName", "")
+
+    # Certifications
+    certifications = [c.get("title") for c in element.get("certifications", []) if c.get("title")]
+    certs_str = ", ".join(certifications)
+
+    # Location
+    location = element.get("location", {}).get("parsed", {})
+    city = location.get("city", "")
+    state = location.get("state", "")
+    country = location.get("country", "")
+
+    return [
+        current_position,
+        current_company,
+        years_exp,
+        skills_str,
+        education_degree,
+        education_institution,
+        certs_str,
+        city,
+        state,
+        country,
+        profile_type
+    ]
+
+
+def iter_profiles(json_path):
+    """Stream profiles from a JSON file, flattening one level of extra list nesting."""
+    for value in iter_json_values(json_path):
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+
+def process_file(json_path, output_csv, header=True):
+    """Stream one JSON file into a CSV file; returns the number of rows written."""
+    profile_type = get_profile_type(json_path)
+    count = 0
     with open(output_csv, "w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow([
-            "current_position",
-            "current_company",
-            "years_of_experience",
-            "total_skills",
-            "education_degree",
-            "education_institution",
-            "certifications",
-            "city",
-            "state",
-            "country",
-            "profile_type"  # Adding profile type based on JSON filename
-        ])
-
-        for profile in data:
-            element = profile.get("element", {})
-
-            # Current position & company
-            current_position = ""
-            current_company = ""
-            if element.get("experience"):
-                current_position = element["experience"][0].get("position", "")
-            if element.get("currentPosition"):
-                current_company = element["currentPosition"][0].get("companyName", "")
-
-            # Years of experience
-            years_exp = calculate_years_of_experience(element.get("experience", []))
-
-            # Skills
-            skills = [s.get("name") for s in element.get("skills", []) if s.get("name")]
-            skills_str = ", ".join(skills)
-
-            # Education (highest degree)
-            education_degree = ""
-            education_institution = ""
-            if element.get("education"):
-                edu = element["education"][0]
-                education_degree = edu.get("degree", "")
-                education_institution = edu.get("schoolName", "")
-
-            # Certifications
-            certifications = [c.get("title") for c in element.get("certifications", []) if c.get("title")]
-            certs_str = ", ".join(certifications)
-
-            # Location
-            location = element.get("location", {}).get("parsed", {})
-            city = location.get("city", "")
-            state = location.get("state", "")
-            country = location.get("country", "")
-
-            # Get profile type from filename (e.g., "blockchain_developer" from "blockchain_developer_final.json")
-            profile_type = os.path.splitext(json_file)[0].replace("_final", "")
-
-            # Write row
-            writer.writerow([
-                current_position,
-                current_company,
-                years_exp,
-                skills_str,
-                education_degree,
-                education_institution,
-                certs_str,
-                city,
-                state,
-                country,
-                profile_type
-            ])
-
-    print(f"✅ Created CSV file: {output_csv}")
-
-print("\n✅ All JSON files have been processed and CSV files have been created in the csv directory")
+        if header:
+            writer.writerow(CSV_COLUMNS)
+        for profile in iter_profiles(json_path):
+            writer.writerow(profile_to_row(profile, profile_type))
+            count += 1
+    return count
+
+
+def _process_job(job):
+    json_path, output_csv, header = job
+    return json_path, output_csv, process_file(json_path, output_csv, header=header)
+
+
+def run(json_dir="json", output="csv/combined.csv", per_file_dir=None, workers=None):
+    """Convert every JSON file in `json_dir` into one combined CSV.
+
+    Files are parsed in parallel across `workers` processes, each streaming
+    its rows to a part file; parts are appended to `output` in filename
+    order as they finish. With `per_file_dir` the per-file CSVs are kept
+    there (with headers), as the original script did.
+    """
+    json_files = sorted(f for f in os.listdir(json_dir) if f.endswith(".json"))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    part_dir = per_file_dir or tempfile.mkdtemp(prefix="preprocess_", dir=os.path.dirname(output) or ".")
+    os.makedirs(part_dir, exist_ok=True)
+
+    jobs = [
+        (os.path.join(json_dir, f), os.path.join(part_dir, f"{os.path.splitext(f)[0]}.csv"), True)
+        for f in json_files
+    ]
+
+    total = 0
+    try:
+        with open(output, "w", newline="", encoding="utf-8") as out, Pool(workers) as pool:
+            csv.writer(out).writerow(CSV_COLUMNS)
+            for json_path, part_csv, count in pool.imap(_process_job, jobs):
+                with open(part_csv, "r", newline="", encoding="utf-8") as part:
+                    part.readline()  # skip the per-file header
+                    shutil.copyfileobj(part, out)
+                total += count
+                print(f"✅ {os.path.basename(json_path)}: {count} profiles")
+    finally:
+        if per_file_dir is None:
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert scraped JSON profile dumps into one CSV.")
+    parser.add_argument("--json-dir", default="json", help="Directory containing JSON files")
+    parser.add_argument("--output", default="csv/combined.csv")
+    parser.add_argument("--per-file-dir", default=None, help="Also keep one CSV per JSON file here")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    total = run(args.json_dir, args.output, args.per_file_dir, args.workers)
+    print(f"\n✅ Wrote {total} profiles to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Serves the profile-type pipeline trained in main.ipynb (TF-IDF on skills
+# and certifications + one-hot + StandardScaler + XGBoost). The fitted
+# ColumnTransformer is unpacked once so a batch of plain dicts is encoded
+# with numpy/scipy directly instead of building a DataFrame per call.
+
+MODEL_FILE = "models/profile_type_xgb_pipeline.joblib"
+LABELS_FILE = "models/profile_type_labels.json"
+
+FEATURE_COLUMNS = [
+    "years_of_experience", "education_degree", "education_institution",
+    "total_skills", "certifications", "city", "state",
+]
+NUMERIC_COLUMNS = {"years_of_experience"}
+
+# File-derived profile types folded onto the labels used in main.ipynb
+PROFILE_TYPE_MAPPING = {
+    'ml_engineer': 'ML_Eng', 'ml_engineers': 'ML_Eng',
+    'data_scientists': 'DS', 'data_analysts': 'DA',
+    'business_analyst_Final': 'BA',
+    'businees_intelligence_developerss': 'BI_Dev',
+    'backendFinal': 'Backend_Dev', 'frontendFinal': 'Frontend_Dev',
+    'fullstackFinal': 'Fullstack_Dev', 'mobiledevFinal': 'Mobile_Dev',
+    'blockchain_developers': 'Blockchain_Dev', 'web3_developers': 'Web3_Dev',
+    'security_analyst': 'Security_Analyst', 'mlopss': 'MLOps_Eng'
+}
+
+
+def _text(value):
+    # main.ipynb fills missing text with "Unknown" before training
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "Unknown"
+    return str(value)
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(number) else number
+
+
+def load_training_frame(csv_path="csv/combined.csv"):
+    """combined.csv cleaned the way main.ipynb does before training."""
+    df = pd.read_csv(csv_path).drop_duplicates()
+    df["years_of_experience"] = pd.to_numeric(df["years_of_experience"], errors="coerce").fillna(0)
+    df = df.fillna("Unknown")
+    df["profile_type"] = df["profile_type"].replace(PROFILE_TYPE_MAPPING)
+    return df
+
+
+def labels_from_csv(csv_path="csv/combined.csv"):
+    """Class names in LabelEncoder order, for pipelines saved without their encoder."""
+    return sorted(load_training_frame(csv_path)["profile_type"].unique().tolist())
+
+
+def train(csv_path="csv/combined.csv", model_path=MODEL_FILE, labels_path=LABELS_FILE):
+    """Retrain the main.ipynb pipeline and save it together with its label mapping."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+    from xgboost import XGBClassifier
+
+    df = load_training_frame(csv_path)
+    le = LabelEncoder()
+    y = le.fit_transform(df["profile_type"])
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), ["years_of_experience"]),
+        ("cat", OneHotEncoder(handle_unknown="ignore"),
+         ["education_degree", "education_institution", "city", "state"]),
+        ("skills", Pipeline([("tfidf", TfidfVectorizer(stop_words='english', max_features=500))]), "total_skills"),
+        ("certs", Pipeline([("tfidf", TfidfVectorizer(stop_words='english', max_features=200))]), "certifications"),
+    ])
+    model = Pipeline([
+        ("preprocessor", preprocessor),
+        ("classifier", XGBClassifier(
+            eval_metric='mlogloss', random_state=42, n_estimators=500, max_depth=6, learning_rate=0.1
+        )),
+    ])
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[FEATURE_COLUMNS], y, test_size=0.2, random_state=42, stratify=y
+    )
+    model.fit(X_train, y_train)
+    print(classification_report(le.inverse_transform(y_test), le.inverse_transform(model.predict(X_test)),
+                                zero_division=0))
+
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    joblib.dump(model, model_path)
+    with open(labels_path, "w", encoding="utf-8") as f:
+        json.dump(le.classes_.tolist(), f, indent=2)
+    return model, le.classes_.tolist()
+
+
+class ProfileClassifier:
+    """Batched profile-type predictions from a fitted sklearn Pipeline.
+
+    `predict_batch` takes plain dicts (missing keys behave like the
+    notebook's "Unknown"/0 fill) and returns label strings. Scalers and
+    one-hot encoders are replaced by precomputed numpy lookups; any other
+    transformer is called on the raw column values. XGBoost models are
+    scored with `inplace_predict`, skipping DMatrix construction.
+    """
+
+    def __init__(self, pipeline, labels=None):
+        self.pipeline = pipeline
+        self.labels = labels
+        preprocessor, self.estimator = pipeline.steps[0][1], pipeline.steps[-1][1]
+        self.sparse_output = getattr(preprocessor, "sparse_output_", True)
+        self.encoders = [
+            self._compile(transformer, columns)
+            for _, transformer, columns in preprocessor.transformers_
+            if transformer != "drop" and len(columns) > 0
+        ]
+        booster = getattr(self.estimator, "get_booster", None)
+        self.booster = booster() if booster is not None else None
+
+    @classmethod
+    def load(cls, model_path=MODEL_FILE, labels_path=LABELS_FILE):
+        labels = None
+        if labels_path and os.path.exists(labels_path):
+            with open(labels_path, "r", encoding="utf-8") as f:
+                labels = json.load(f)
+        return cls(joblib.load(model_path), labels)
+
+    def _compile(self, transformer, columns):
+        """A function mapping a list of dicts to this transformer's output block."""
+        single = isinstance(columns, str)
+        columns = [columns] if single else list(columns)
+        name = type(transformer).__name__
+
+        if name == "StandardScaler" and all(c in NUMERIC_COLUMNS for c in columns):
+            mean = transformer.mean_ if transformer.with_mean else 0.0
+            scale = transformer.scale_ if transformer.with_std else 1.0
+
+            def encode(rows):
+                values = np.array([[_number(r.get(c)) for c in columns] for r in rows], dtype=np.float64)
+                return sparse.csr_matrix((values - mean) / scale)
+            return encode
+
+        if (name == "OneHotEncoder" and getattr(transformer, "drop_idx_", None) is None
+                and not getattr(transformer, "_infrequent_enabled", False)):
+            lookups, offset = [], 0
+            for categories in transformer.categories_:
+                lookups.append((offset, {c: i for i, c in enumerate(categories)}))
+                offset += len(categories)
+
+            def encode(rows):
+                indices, indptr = [], [0]
+                for r in rows:
+                    for col, (start, lookup) in zip(columns, lookups):
+                        code = lookup.get(_text(r.get(col)))
+                        if code is not None:  # handle_unknown="ignore": unseen values encode as all zeros
+                            indices.append(start + code)
+                    indptr.append(len(indices))
+                data = np.ones(len(indices), dtype=np.float64)
+                return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), offset))
+            return encode
+
+        if single:
+            # Text pipelines (TF-IDF) take a 1-D sequence of strings
+            def encode(rows):
+                return sparse.csr_matrix(transformer.transform([_text(r.get(columns[0])) for r in rows]))
+            return encode
+
+        def encode(rows):
+            frame = pd.DataFrame(
+                [{c: _number(r.get(c)) if c in NUMERIC_COLUMNS else _text(r.get(c)) for c in columns} for r in rows]
+            )
+            return sparse.csr_matrix(transformer.transform(frame))
+        return encode
+
+    def transform(self, profiles):
+        """Feature matrix for a list of profile dicts, matching the pipeline's preprocessor."""
+        X = sparse.hstack([encode(profiles) for encode in self.encoders], format="csr")
+        return X if self.sparse_output else X.toarray()
+
+    def predict_proba_batch(self, profiles):
+        X = self.transform(profiles)
+        if self.booster is not None:
+            proba = np.asarray(self.booster.inplace_predict(X))
+            if proba.ndim == 1:  # binary objective returns P(class 1)
+                proba = np.column_stack([1 - proba, proba])
+            return proba
+        return self.estimator.predict_proba(X)
+
+    def predict_batch(self, profiles):
+        """Profile type label for every dict (class indices when no label mapping is loaded)."""
+        if not profiles:
+            return []
+        codes = self.predict_proba_batch(profiles).argmax(axis=1)
+        classes = getattr(self.estimator, "classes_", None)
+        if classes is not None:
+            codes = np.asarray(classes)[codes]
+        if self.labels is None:
+            return codes.tolist()
+        return [self.labels[c] for c in codes]
+
+    def predict(self, profile):
+        return self.predict_batch([profile])[0]
+
+
+def benchmark(classifier, profiles, n_single=200):
+    """Single-row p50/p99 latency and bulk throughput, fast path vs. pipeline.predict(DataFrame)."""
+    def latencies(fn):
+        timings = []
+        for profile in profiles[:n_single]:
+            start = time.perf_counter()
+            fn(profile)
+            timings.append((time.perf_counter() - start) * 1000)
+        return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+    report = {}
+    report["single_fast_p50_ms"], report["single_fast_p99_ms"] = latencies(classifier.predict)
+    report["single_pipeline_p50_ms"], report["single_pipeline_p99_ms"] = latencies(
+        lambda p: classifier.pipeline.predict(pd.DataFrame([p])[FEATURE_COLUMNS])
+    )
+
+    start = time.perf_counter()
+    fast = classifier.predict_batch(profiles)
+    report["bulk_fast_rows_per_s"] = len(profiles) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    slow = classifier.pipeline.predict(pd.DataFrame(profiles)[FEATURE_COLUMNS])
+    report["bulk_pipeline_rows_per_s"] = len(profiles) / (time.perf_counter() - start)
+
+    if classifier.labels is not None:
+        slow = [classifier.labels[c] for c in slow]
+    report["agreement"] = float(np.mean([a == b for a, b in zip(fast, slow)]))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile-type classifier: retrain, predict and benchmark.")
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--csv", default="csv/combined.csv")
+    parser.add_argument("--train", action="store_true", help="Retrain from --csv and save model + labels")
+    parser.add_argument("--write-labels", action="store_true",
+                        help="Recreate --labels from --csv for a pipeline saved without its LabelEncoder")
+    parser.add_argument("--bench", action="store_true", help="Benchmark on the profiles in --csv")
+    args = parser.parse_args()
+
+    if args.train:
+        train(args.csv, args.model, args.labels)
+    if args.write_labels:
+        labels = labels_from_csv(args.csv)
+        with open(args.labels, "w", encoding="utf-8") as f:
+            json.dump(labels, f, indent=2)
+        print(f"✅ Wrote {len(labels)} labels to {args.labels}")
+
+    if args.bench:
+        classifier = ProfileClassifier.load(args.model, args.labels)
+        profiles = load_training_frame(args.csv)[FEATURE_COLUMNS].to_dict("records")
+        for metric, value in benchmark(classifier, profiles).items():
+            print(f"  {metric:<26} {value:12.3f}")
@@ -0,0 +1,242 @@
+import os
+import time
+import argparse
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+from vector_index import ExactIndex, normalize_rows, recall_at_k, top_k_rows
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 quantization: x ~ codes * scale + offset."""
+
+    kind = "sq8"
+
+    def __init__(self, scale, offset):
+        self.scale = scale
+        self.offset = offset
+
+    @classmethod
+    def train(cls, vectors, sample_size=100_000, random_state=42):
+        rng = np.random.default_rng(random_state)
+        idx = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[idx], dtype=np.float32)
+        lo, hi = sample.min(axis=0), sample.max(axis=0)
+        scale = np.maximum(hi - lo, 1e-12) / 255.0
+        offset = lo + 128.0 * scale
+        return cls(scale.astype(np.float32), offset.astype(np.float32))
+
+    def encode(self, block):
+        codes = np.rint((np.asarray(block, dtype=np.float32) - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def score_block(self, queries, codes):
+        # q . (c * scale + offset) == (q * scale) . c + q . offset
+        return (queries * self.scale) @ codes.astype(np.float32).T + (queries @ self.offset)[:, None]
+
+    def to_arrays(self):
+        return {"scale": self.scale, "offset": self.offset}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data["scale"], data["offset"])
+
+
+class ProductQuantizer:
+    """Splits vectors into `m` sub-vectors, each coded by one of 256 centroids."""
+
+    kind = "pq"
+
+    def __init__(self, codebooks):
+        # codebooks: (m, 256, dim // m)
+        self.codebooks = codebooks
+
+    @property
+    def m(self):
+        return self.codebooks.shape[0]
+
+    @classmethod
+    def train(cls, vectors, m=64, sample_size=50_000, random_state=42):
+        dim = vectors.shape[1]
+        if dim % m:
+            raise ValueError(f"Embedding dim {dim} is not divisible by m={m}")
+        rng = np.random.default_rng(random_state)
+        idx = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[idx], dtype=np.float32)
+        ksub = min(256, len(sample))
+        sub = dim // m
+
+        codebooks = np.zeros((m, 256, sub), dtype=np.float32)
+        for j in range(m):
+            km = KMeans(n_clusters=ksub, n_init=1, max_iter=25, random_state=random_state)
+            km.fit(sample[:, j * sub:(j + 1) * sub])
+            codebooks[j, :ksub] = km.cluster_centers_
+        return cls(codebooks)
+
+    def encode(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        sub = self.codebooks.shape[2]
+        codes = np.empty((len(block), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            part = block[:, j * sub:(j + 1) * sub]
+            dists = (
+                (part ** 2).sum(axis=1)[:, None]
+                - 2 * part @ self.codebooks[j].T
+                + (self.codebooks[j] ** 2).sum(axis=1)[None, :]
+            )
+            codes[:, j] = np.argmin(dists, axis=1)
+        return codes
+
+    def score_block(self, queries, codes):
+        # Asymmetric distance: per-query lookup tables of sub-vector inner products
+        sub = self.codebooks.shape[2]
+        tables = np.einsum("qms,mks->qmk", queries.reshape(len(queries), self.m, sub), self.codebooks)
+        cols = np.arange(self.m)
+        return np.stack([table[cols, codes].sum(axis=1) for table in tables])
+
+    def to_arrays(self):
+        return {"codebooks": self.codebooks}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data["codebooks"])
+
+
+QUANTIZERS = {cls.kind: cls for cls in (ScalarQuantizer, ProductQuantizer)}
+
+
+class QuantizedIndex:
+    """Coarse scan over compressed codes, exact re-ranking of a short list.
+
+    Only `codes` need to stay resident; full-precision `vectors` (usually a
+    memory-mapped store) are read for the `rerank` best candidates only.
+    """
+
+    block_size = 65536
+
+    def __init__(self, vectors, quantizer, codes, rerank=100):
+        self.vectors = vectors
+        self.quantizer = quantizer
+        self.codes = codes
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, embeddings, kind="sq8", rerank=100, normalized=False, **train_kwargs):
+        vectors = embeddings if normalized else normalize_rows(embeddings)
+        quantizer = QUANTIZERS[kind].train(vectors, **train_kwargs)
+        codes = np.concatenate([
+            quantizer.encode(vectors[start:start + cls.block_size])
+            for start in range(0, len(vectors), cls.block_size)
+        ])
+        return cls(vectors, quantizer, codes, rerank=rerank)
+
+    @classmethod
+    def load(cls, path, vectors, rerank=100):
+        data = np.load(path)
+        quantizer = QUANTIZERS[str(data["kind"])].from_arrays(data)
+        return cls(vectors, quantizer, data["codes"], rerank=rerank)
+
+    def save(self, path):
+        np.savez(path, kind=self.quantizer.kind, codes=self.codes, **self.quantizer.to_arrays())
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @property
+    def code_bytes(self):
+        return self.codes.nbytes
+
+    def search(self, query, top_k=10, rerank=None):
+        idx, scores = self.search_batch([query], top_k, rerank)
+        return idx[0], scores[0]
+
+    def search_batch(self, queries, top_k=10, rerank=None):
+        """Same contract as ExactIndex.search_batch; `rerank=0` ranks by the quantized scores alone."""
+        queries = normalize_rows(queries)
+        rerank = self.rerank if rerank is None else rerank
+
+        approx = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            block = self.codes[start:start + self.block_size]
+            approx[:, start:start + len(block)] = self.quantizer.score_block(queries, block)
+        if not rerank:
+            idx = top_k_rows(approx, top_k)
+            return idx, np.take_along_axis(approx, idx, axis=1)
+        candidates = top_k_rows(approx, max(rerank, top_k))
+
+        all_idx = np.empty((len(queries), min(top_k, len(self))), dtype=np.int64)
+        all_scores = np.empty(all_idx.shape, dtype=np.float32)
+        for q, cand in enumerate(candidates):
+            cand = np.sort(cand)
+            sims = np.asarray(self.vectors[cand], dtype=np.float32) @ queries[q]
+            best = top_k_rows(sims[None, :], top_k)[0]
+            all_idx[q] = cand[best]
+            all_scores[q] = sims[best]
+        return all_idx, all_scores
+
+
+def quantization_report(vectors, indexes, reranks=(0, 50, 100, 200), top_k=10, n_queries=200, random_state=0):
+    """Memory, latency and recall@k of each quantized index against exact float32 search."""
+    rng = np.random.default_rng(random_state)
+    picks = np.sort(rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False))
+    queries = np.asarray(vectors[picks], dtype=np.float32)
+    queries = normalize_rows(queries + rng.normal(scale=0.5 / np.sqrt(queries.shape[1]), size=queries.shape))
+
+    exact = ExactIndex(vectors, normalized=True)
+    start = time.perf_counter()
+    exact_idx, _ = exact.search_batch(queries, top_k)
+    rows = [{
+        "mode": "float32",
+        "rerank": None,
+        "resident_bytes": len(vectors) * vectors.shape[1] * 4,
+        "recall": 1.0,
+        "ms_per_query": 1000 * (time.perf_counter() - start) / len(queries),
+    }]
+
+    for index in indexes:
+        for rerank in reranks:
+            start = time.perf_counter()
+            # rerank=0 is the raw quantized ranking, without an exact pass
+            approx_idx, _ = index.search_batch(queries, top_k, rerank=rerank)
+            elapsed = time.perf_counter() - start
+            rows.append({
+                "mode": index.quantizer.kind,
+                "rerank": rerank,
+                "resident_bytes": index.code_bytes,
+                "recall": recall_at_k(approx_idx, exact_idx),
+                "ms_per_query": 1000 * elapsed / len(queries),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    from embedding_store import load_store
+
+    parser = argparse.ArgumentParser(description="Build quantized indexes for an embedding store and compare tradeoffs.")
+    parser.add_argument("--store", default="data/store")
+    parser.add_argument("--mode", nargs="+", choices=sorted(QUANTIZERS), default=["sq8", "pq"])
+    parser.add_argument("--pq-m", type=int, default=64, help="Number of PQ sub-vectors")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 50, 100, 200])
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    _, vectors, _ = load_store(args.store)
+    indexes = []
+    for kind in args.mode:
+        train_kwargs = {"m": args.pq_m} if kind == "pq" else {}
+        index = QuantizedIndex.build(vectors, kind=kind, normalized=True, **train_kwargs)
+        index.save(os.path.join(args.store, f"{kind}.npz"))
+        print(f"✅ Built {kind} index: {index.code_bytes / 1e6:.1f} MB of codes")
+        indexes.append(index)
+
+    for row in quantization_report(vectors, indexes, reranks=args.rerank, top_k=args.top_k):
+        print(
+            f"{row['mode']:>7}  rerank={str(row['rerank']):>4}  "
+            f"memory={row['resident_bytes'] / 1e6:8.1f} MB  "
+            f"recall@{args.top_k}={row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query"
+        )
@@ -0,0 +1,111 @@
+import time
+import threading
+from collections import OrderedDict
+
+from embedding_cache import CACHE_LOOKUPS
+from skill_index import SKILL_ALIASES, split_skills
+
+
+def canonicalize_skills(text, aliases=SKILL_ALIASES):
+    """Order-insensitive canonical form of a comma separated skill list.
+
+    Normalizes every skill with `skill_index.normalize_skill`, drops
+    duplicates and sorts, so "ReactJS, java,JavaScript" and
+    "javascript,react.js,Java" map to the same string.
+    """
+    return ", ".join(sorted(set(split_skills(text, aliases))))
+
+
+class QueryEmbeddingCache:
+    """LRU + TTL cache in front of an embedding client for user queries.
+
+    Queries are keyed by `canonicalize_skills`, and the canonical text is
+    what gets embedded, so every spelling of a skill set shares one vector.
+    An optional `disk_cache` (an `EmbeddingCache`) acts as a second tier
+    that survives restarts. Entries expire `ttl` seconds after they were
+    stored, in memory and on disk; hits do not extend them.
+    """
+
+    def __init__(self, client, maxsize=10_000, ttl=3600, disk_cache=None):
+        self.client = client
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_cache = disk_cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # The SQLite connection is shared, so disk access is serialized on its
+        # own lock and memory lookups never wait for disk I/O
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):
+        """Embeddings for `texts` in order; all misses go out in one request."""
+        keys = [canonicalize_skills(t) for t in texts]
+        found, expiry = {}, {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    expiry[key], found[key] = entry
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache="query_memory", result="hit")
+                elif key not in found:
+                    self._entries.pop(key, None)
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        CACHE_LOOKUPS.inc(len(missing), cache="query_memory", result="miss")
+        if missing and self.disk_cache is not None:
+            with self._disk_lock:
+                stored = self.disk_cache.get_many(missing, max_age=self.ttl, with_created=True)
+            age_offset = time.monotonic() - time.time()
+            for key, hit in zip(missing, stored):
+                if hit is not None:
+                    # Disk hits expire `ttl` after they were first stored, not now
+                    found[key], created = hit
+                    expiry[key] = created + age_offset + self.ttl
+            with self._lock:
+                self.disk_hits += sum(hit is not None for hit in stored)
+            missing = [k for k in missing if k not in found]
+
+        if missing:
+            embeddings = self.client.embed(missing)
+            found.update(zip(missing, embeddings))
+            with self._lock:
+                self.misses += len(missing)
+            if self.disk_cache is not None:
+                with self._disk_lock:
+                    self.disk_cache.put_many(missing, embeddings)
+
+        with self._lock:
+            expires = time.monotonic() + self.ttl
+            for key in dict.fromkeys(keys):
+                # Cached entries keep the expiry they were stored with
+                self._entries[key] = (expiry.get(key, expires), found[key])
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return [found[k] for k in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -1,32 +1,452 @@
+import os
+
 import joblib
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import pandas as pd
+
+import metrics
+from cluster_profiles import CLUSTER_MODEL_FILE, ClusterProfiles, embed_skills, profiles_path
+from embedding_store import FILTERS_FILE, LEXICAL_FILE, ROLES_FILE, load_store
+from filter_index import FilterIndex
+from lexical_index import LexicalIndex, top_scores
+from quantized_index import QUANTIZERS, QuantizedIndex
+from role_index import RoleIndex
+from salary_model import MODEL_FILE as SALARY_MODEL_FILE, SalaryModel
+from segmented_store import SegmentedIndex, deleted_rows, read_snapshot
+from sharded_index import ShardedIndex
+from skill_index import SkillMatrix
+from vector_index import ExactIndex, IVFIndex, normalize_rows
+
+PROFILE_COLUMNS = [
+    "current_position",
+    "total_skills",
+    "education_degree",
+    "years_of_experience",
+    "text"
+]
+
+LOAD_SECONDS = metrics.histogram("index_load_seconds", "Time to load the corpus and build its indexes")
+SEARCH_SECONDS = metrics.histogram("similarity_search_seconds", "Similarity search latency by index type")
+ROLE_SECONDS = metrics.histogram("role_ranking_seconds", "Role ranking latency")
+SKILL_SECONDS = metrics.histogram("skill_ranking_seconds", "Skill ranking latency")
+
 
 class CareerRecommender:
+    # Candidates taken from each of the dense and lexical searches before fusing
+    hybrid_candidates = 200
+
     def __init__(self, embeddings_path="data/embeddings.joblib"):
-        self.df = joblib.load(embeddings_path)
-        self.embeddings = np.vstack(self.df["embedding"].values)
-
-    def find_similar_profiles(self, query_embedding, top_k=10):
-        """Find top similar profiles based on cosine similarity."""
-        sims = cosine_similarity([query_embedding], self.embeddings)[0]
-        top_idx = sims.argsort()[-top_k:][::-1]
-
-        return self.df.iloc[top_idx][[
-            "current_position",
-            "total_skills",
-            "education_degree",
-            "years_of_experience",
-            "text"
-        ]]
-
-    def recommend_roles(self, query_embedding, top_k=10):
-        """Recommend similar career roles."""
-        top_profiles = self.find_similar_profiles(query_embedding, top_k)
-        return top_profiles["current_position"].value_counts().head(3).index.tolist()
-
-    def recommend_skills(self, query_embedding, top_k=10):
-        """Recommend potential new skills to learn."""
-        top_profiles = self.find_similar_profiles(query_embedding, top_k)
-        all_skills = ", ".join(top_profiles["total_skills"].fillna("")).lower().split(", ")
-        return list(set(all_skills))[:10]
+        with LOAD_SECONDS.time(source="joblib"):
+            df = joblib.load(embeddings_path)
+            index = ExactIndex(np.vstack(df.pop("embedding").values))
+            self._attach(df, index)
+
+    @classmethod
+    def from_store(cls, store_path="data/store", index="exact", nprobe=8, rerank=100, workers=None):
+        """Load from a memory-mapped embedding store (see embedding_store.py).
+
+        `index="ivf"` uses the approximate index saved in the store by
+        `python vector_index.py --store <path>`; `index="sq8"` or `"pq"`
+        use the quantized indexes saved by `python quantized_index.py`;
+        `index="sharded"` searches exactly across `workers` processes.
+        """
+        if index not in ("exact", "ivf", "sharded") and index not in QUANTIZERS:
+            raise ValueError(f"Unknown index type: {index!r}")
+        with LOAD_SECONDS.time(source="store"):
+            df, vectors, _ = load_store(store_path)
+            if index == "exact":
+                search_index = ExactIndex(vectors, normalized=True)
+            elif index == "ivf":
+                search_index = IVFIndex.load(os.path.join(store_path, "ivf.npz"), vectors, nprobe=nprobe)
+            elif index == "sharded":
+                search_index = ShardedIndex(vectors, workers=workers, normalized=True)
+            else:
+                search_index = QuantizedIndex.load(os.path.join(store_path, f"{index}.npz"), vectors, rerank=rerank)
+            roles_path = os.path.join(store_path, ROLES_FILE)
+            roles = RoleIndex.load(roles_path) if os.path.exists(roles_path) else None
+            filters_path = os.path.join(store_path, FILTERS_FILE)
+            filters = FilterIndex.load(filters_path) if os.path.exists(filters_path) else None
+            lexical_path = os.path.join(store_path, LEXICAL_FILE)
+            lexical = LexicalIndex.load(lexical_path) if os.path.exists(lexical_path) else None
+            recommender = cls.__new__(cls)
+            recommender._attach(df, search_index, roles, filters, lexical)
+        return recommender
+
+    @classmethod
+    def from_segments(cls, root="data/segments"):
+        """Load a segmented store (see segmented_store.py); `refresh()` picks up later writes."""
+        with LOAD_SECONDS.time(source="segments"):
+            manifest, segments, _ = read_snapshot(root)
+            if not segments:
+                raise ValueError(f"No segments under {root}")
+            recommender = cls.__new__(cls)
+            recommender._attach(
+                pd.concat([df for _, df, _ in segments], ignore_index=True),
+                SegmentedIndex([vectors for _, _, vectors in segments]),
+            )
+            recommender._attach_segments(root, manifest, [name for name, _, _ in segments])
+        return recommender
+
+    def refresh(self):
+        """Pick up segments, updates and deletes written since loading (from_segments only).
+
+        New segments are appended to the loaded ones and their skill, role,
+        filter and BM25 indexes merged in, rather than reloading everything;
+        after a compaction the segments are reloaded. The update is built
+        aside and applied in one step, so a copy of the recommender
+        (copy.copy) can be refreshed while the original keeps serving.
+        Cluster stats do not survive a reload; call use_clusters again.
+        When every row was deleted and compacted away, nothing is served
+        until segments are added again. Appending needs the index
+        from_segments builds (ValueError after use_ivf/use_sharded).
+        Returns True when anything changed.
+        """
+        if self.segments_root is None:
+            raise ValueError("refresh() needs a recommender loaded with from_segments()")
+        manifest, segments, appended = read_snapshot(self.segments_root, self.segment_names)
+        if manifest["version"] == self.segments_version:
+            return False
+
+        if not manifest["segments"]:
+            # Every row was deleted and compacted away: serve nothing until new
+            # segments arrive, which a later refresh then reloads
+            live = np.empty(0, dtype=np.int64)
+            self.__dict__.update(
+                segments_version=manifest["version"],
+                deleted=np.arange(len(self.df), dtype=np.int64),
+                _live=live,
+                lexical=LexicalIndex.from_skill_matrix(self.skills, live=live),
+            )
+            return True
+
+        if not appended:
+            salary_model = self.salary_model
+            self.__dict__.update(type(self).from_segments(self.segments_root).__dict__)
+            self.salary_model = salary_model
+            return True
+
+        state = {}
+        if segments:
+            if not isinstance(self.index, SegmentedIndex):
+                raise ValueError(
+                    f"refresh() cannot append segments to a {type(self.index).__name__}; "
+                    "serve segmented stores with the index from_segments() builds"
+                )
+            with LOAD_SECONDS.time(source="segments"):
+                added = pd.concat([df for _, df, _ in segments], ignore_index=True)
+                index = self.index
+                for _, _, vectors in segments:
+                    index = index.with_segment(vectors)
+                skills = self.skills.with_rows(added["total_skills"].values)
+                state = {
+                    "df": pd.concat([self.df, added], ignore_index=True),
+                    "index": index,
+                    "embeddings": index.vectors,
+                    "_exact": index,
+                    "skills": skills,
+                    "roles": self.roles.with_rows(added["current_position"].values),
+                    "filters": self.filters.with_rows(added),
+                    "_profile_columns": None,
+                }
+        self._attach_segments(self.segments_root, manifest, self.segment_names + [n for n, _, _ in segments], state)
+        return True
+
+    def _attach_segments(self, root, manifest, names, state=None):
+        state = dict(state or {})
+        deleted = deleted_rows(manifest)
+        n = len(state.get("df", self.df))
+        live = np.setdiff1d(np.arange(n), deleted, assume_unique=True) if len(deleted) else None
+        if live is not None or "skills" in state:
+            # BM25 statistics cover live rows only, so tombstones do not skew idf
+            state["lexical"] = LexicalIndex.from_skill_matrix(state.get("skills", self.skills), live=live)
+        state.update(
+            segments_root=root,
+            segment_names=names,
+            segments_version=manifest["version"],
+            deleted=deleted,
+            _live=live,
+        )
+        self.__dict__.update(state)
+
+    def use_ivf(self, nlist=None, nprobe=8, seed_model_path=None):
+        """Replace exact search with an IVF index built over the loaded embeddings.
+
+        `seed_model_path` (e.g. models/skill_clusters2.joblib) seeds the
+        lists with that KMeans model's centroids.
+        """
+        seed = joblib.load(seed_model_path).cluster_centers_ if seed_model_path else None
+        self._replace_index(IVFIndex.build(
+            self.embeddings, nlist=nlist, nprobe=nprobe, seed_centroids=seed, normalized=True
+        ))
+        return self.index
+
+    def use_sharded(self, n_shards=None, workers=None):
+        """Replace exact search with a ShardedIndex over the loaded embeddings."""
+        self._replace_index(ShardedIndex(self.embeddings, n_shards=n_shards, workers=workers, normalized=True))
+        self.embeddings = self.index.vectors
+        self._exact = ExactIndex(self.embeddings, normalized=True)
+        return self.index
+
+    def _replace_index(self, index):
+        # A replaced ShardedIndex would keep its workers and shared memory until collected
+        previous, self.index = self.index, index
+        if previous is not index and isinstance(previous, ShardedIndex):
+            previous.close()
+
+    def use_salary_model(self, path=SALARY_MODEL_FILE):
+        """Load a salary model trained by `python salary_model.py` for estimate_salary*."""
+        self.salary_model = SalaryModel.load(path)
+        return self.salary_model
+
+    def estimate_salary(self, query_embedding, years=None, city=None):
+        """Estimated annual salary (INR) for a profile or query embedding; None without a salary model."""
+        if self.salary_model is None:
+            return None
+        return self.salary_model.predict(query_embedding, years, city)
+
+    def estimate_salary_batch(self, query_embeddings, years=None, cities=None):
+        """`estimate_salary` for many embeddings; `years`/`cities` are one entry per query."""
+        if self.salary_model is None:
+            return None
+        return self.salary_model.predict_batch(query_embeddings, years, cities)
+
+    def use_clusters(self, model_path=CLUSTER_MODEL_FILE, rebuild=False, client=None,
+                     cache_path="data/embedding_cache.sqlite"):
+        """Load a KMeans skill-cluster model and its precomputed stats for cluster_profile*.
+
+        The stats (`python cluster_profiles.py`) are rebuilt over the loaded
+        corpus and saved next to the model when missing, when the model was
+        refit since, or with `rebuild=True`. Rebuilding embeds every
+        profile's skills (`embed_skills`, cache first; `client` for misses).
+        """
+        kmeans = joblib.load(model_path)
+        path = profiles_path(model_path)
+        clusters = ClusterProfiles.load(path) if os.path.exists(path) and not rebuild else None
+        if clusters is None or not clusters.is_current(kmeans, len(self.df)):
+            skill_vectors = embed_skills(self.df["total_skills"].values, client, cache_path)
+            clusters = ClusterProfiles.build(kmeans, skill_vectors, self.skills)
+            clusters.save(path)
+        self.clusters = clusters
+        return clusters
+
+    def cluster_profile(self, query_embedding, n_skills=10, n_representatives=5):
+        """Skill cluster of a skills-only embedding (a skill list embedded as is) with what is typical there.
+
+        Returns {"cluster", "distance", "size", "top_skills" [(skill, members
+        listing it)], "representatives" (profiles nearest the centroid)};
+        None without clusters (see use_clusters).
+        """
+        if self.clusters is None:
+            return None
+        return self.cluster_profile_batch([query_embedding], n_skills, n_representatives)[0]
+
+    def cluster_profile_batch(self, query_embeddings, n_skills=10, n_representatives=5):
+        """`cluster_profile` for many embeddings in one centroid lookup."""
+        if self.clusters is None:
+            return None
+        labels, distances = self.clusters.assign(query_embeddings)
+        return [
+            {
+                "cluster": int(cluster),
+                "distance": float(distance),
+                "size": self.clusters.size(cluster),
+                "top_skills": self.clusters.top_skills[cluster][:n_skills],
+                "representatives": self.df.iloc[self.clusters.representatives[cluster][:n_representatives]][
+                    PROFILE_COLUMNS
+                ],
+            }
+            for cluster, distance in zip(labels, distances)
+        ]
+
+    def _attach(self, df, index, roles=None, filters=None, lexical=None):
+        self.df = df
+        self.index = index
+        self.embeddings = index.vectors
+        # Filtered searches run exactly over the selected rows, whatever the main index is
+        self._exact = index if isinstance(index, (ExactIndex, SegmentedIndex)) else ExactIndex(
+            index.vectors, normalized=True
+        )
+        self.skills = SkillMatrix.build(df["total_skills"].values)
+        self.roles = roles if roles is not None else RoleIndex.build(df["current_position"].values)
+        self.filters = filters if filters is not None else FilterIndex.build(df)
+        self.lexical = lexical if lexical is not None else LexicalIndex.from_skill_matrix(self.skills)
+        self.salary_model = None
+        self.clusters = None
+        self._profile_columns = None
+        # Set by from_segments: deleted rows are never returned
+        self.segments_root = None
+        self.segment_names = []
+        self.segments_version = None
+        self.deleted = np.empty(0, dtype=np.int64)
+        self._live = None
+
+    def find_similar_profiles(self, query_embedding, top_k=10, filters=None):
+        """Find top similar profiles based on cosine similarity.
+
+        `filters` restricts the candidates before ranking, e.g.
+        {"city": "Bangalore", "years_of_experience": (3, 6)}; see
+        FilterIndex.select for the supported fields.
+        """
+        top_idx, _ = self._search(query_embedding, top_k, filters)
+        return self.df.iloc[top_idx][PROFILE_COLUMNS]
+
+    def find_similar_profiles_batch(self, query_embeddings, top_k=10, filters=None):
+        """Find top similar profiles for several queries in one search."""
+        top_idx, _ = self._search_batch(query_embeddings, top_k, filters)
+        return [self.df.iloc[row[row >= 0]][PROFILE_COLUMNS] for row in top_idx]
+
+    def recommend_roles(self, query_embedding, top_k=10, n_roles=3, filters=None):
+        """Recommend similar career roles.
+
+        Neighbors vote for their normalized role with their similarity, so
+        "Sr. Data Engineer" and "Senior Data Engineer" count together.
+        """
+        top_idx, scores = self._search(query_embedding, top_k, filters)
+        with ROLE_SECONDS.time():
+            return self.roles.rank(top_idx, scores, n_roles)
+
+    def recommend_skills(self, query_embedding, top_k=10, user_skills=None, n_skills=10, filters=None):
+        """Recommend potential new skills to learn.
+
+        Skills are ranked by the summed similarity of the neighbors that
+        have them; anything in `user_skills` is left out.
+        """
+        top_idx, scores = self._search(query_embedding, top_k, filters)
+        with SKILL_SECONDS.time():
+            return self.skills.recommend(top_idx, scores, exclude=user_skills, n_skills=n_skills)
+
+    def recommend(self, query_embedding, top_k=10, n_roles=3, n_skills=10, user_skills=None, filters=None,
+                  lexical_weight=0.0):
+        """Similar profiles, roles and skills from a single similarity search.
+
+        With `lexical_weight` > 0 the dense scores are fused with BM25
+        matches on `user_skills`; with `query_embedding=None` (e.g. the
+        embedding service is down) the search is purely lexical.
+        Returns a dict with "profiles" (DataFrame), "scores", "roles" and "skills".
+        """
+        if query_embedding is None:
+            top_idx, scores = self.lexical_search(user_skills, top_k, filters)
+        elif lexical_weight and user_skills:
+            top_idx, _ = self._search(query_embedding, max(top_k, self.hybrid_candidates), filters)
+            top_idx, scores = self._fuse(query_embedding, top_idx, user_skills, top_k, lexical_weight, filters)
+        else:
+            top_idx, scores = self._search(query_embedding, top_k, filters)
+        return self._build_result(top_idx, scores, n_roles, n_skills, user_skills)
+
+    def recommend_batch(self, query_embeddings, top_k=10, n_roles=3, n_skills=10, user_skills=None,
+                        as_records=False, filters=None, lexical_weight=0.0):
+        """`recommend` for many queries with a single batched similarity search.
+
+        `top_k` may be one value or one per query; `user_skills`, if given,
+        is one entry per query. `filters` is one dict for every query or a
+        list with one per query; queries sharing a filter are searched
+        together. `query_embeddings=None` answers every query lexically from
+        `user_skills`. With `as_records` the profiles come back as plain
+        JSON-ready dicts instead of DataFrames, skipping pandas.
+        """
+        n = len(query_embeddings) if query_embeddings is not None else len(user_skills)
+        top_ks = [top_k] * n if np.isscalar(top_k) else list(top_k)
+        user_skills = user_skills if user_skills is not None else [None] * n
+        query_filters = filters if isinstance(filters, list) else [filters] * n
+
+        if query_embeddings is None:
+            hits = [self.lexical_search(*args) for args in zip(user_skills, top_ks, query_filters)]
+        else:
+            k = max(top_ks, default=0)
+            if lexical_weight:
+                k = max(k, self.hybrid_candidates)
+            all_idx, all_scores = self._search_grouped(query_embeddings, k, filters)
+            hits = []
+            for query, row_idx, row_scores, k, skills, f in zip(
+                query_embeddings, all_idx, all_scores, top_ks, user_skills, query_filters
+            ):
+                found = row_idx >= 0
+                if lexical_weight and skills:
+                    hits.append(self._fuse(query, row_idx[found], skills, k, lexical_weight, f))
+                else:
+                    hits.append((row_idx[found][:k], row_scores[found][:k]))
+        return [
+            self._build_result(top_idx, scores, n_roles, n_skills, skills, as_records)
+            for (top_idx, scores), skills in zip(hits, user_skills)
+        ]
+
+    def lexical_search(self, skills, top_k=10, filters=None):
+        """(indices, BM25 scores) of the profiles best matching a skill list, without embeddings."""
+        with SEARCH_SECONDS.time(index="lexical"):
+            return self.lexical.search(skills or "", top_k, self._select(filters))
+
+    def profile_records(self, top_idx):
+        """PROFILE_COLUMNS of the given rows as dicts, with missing values as None."""
+        if self._profile_columns is None:
+            self._profile_columns = {
+                col: self.df[col].astype(object).where(self.df[col].notna(), None).to_numpy()
+                for col in PROFILE_COLUMNS
+            }
+        return [{col: values[i] for col, values in self._profile_columns.items()} for i in top_idx]
+
+    def _build_result(self, top_idx, scores, n_roles, n_skills, user_skills, as_records=False):
+        with ROLE_SECONDS.time():
+            roles = self.roles.rank(top_idx, scores, n_roles)
+        with SKILL_SECONDS.time():
+            skills = self.skills.recommend(top_idx, scores, exclude=user_skills, n_skills=n_skills)
+        return {
+            "profiles": self.profile_records(top_idx) if as_records else self.df.iloc[top_idx][PROFILE_COLUMNS],
+            "scores": scores.tolist(),
+            "roles": roles,
+            "skills": skills,
+        }
+
+    def _search(self, query_embedding, top_k, filters=None):
+        # Approximate and filtered searches pad with -1 when they run short
+        top_idx, scores = self._search_batch([query_embedding], top_k, filters)
+        found = top_idx[0] >= 0
+        return top_idx[0][found], scores[0][found]
+
+    def _search_grouped(self, query_embeddings, top_k, filters):
+        """`_search_batch` where `filters` may also be a list with one filter per query."""
+        if filters is None or isinstance(filters, dict):
+            return self._search_batch(query_embeddings, top_k, filters)
+        n = len(query_embeddings)
+        queries = np.asarray(query_embeddings)
+        all_idx = np.full((n, top_k), -1, dtype=np.int64)
+        all_scores = np.full((n, top_k), -np.inf, dtype=np.float32)
+        groups = {}
+        for i, f in enumerate(filters):
+            groups.setdefault(repr(sorted((f or {}).items())), (f, []))[1].append(i)
+        for f, rows in groups.values():
+            all_idx[rows], all_scores[rows] = self._search_batch(queries[rows], top_k, f)
+        return all_idx, all_scores
+
+    def _fuse(self, query_embedding, dense_idx, skills, top_k, weight, filters=None):
+        """Re-rank dense and BM25 candidates by (1 - weight) * cosine + weight * scaled BM25."""
+        with SEARCH_SECONDS.time(index="lexical"):
+            lexical = self.lexical.score(skills)
+            lexical_idx, _ = top_scores(lexical, self.hybrid_candidates, self._select(filters))
+        candidates = np.union1d(dense_idx, lexical_idx)
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+        dense = np.asarray(self.embeddings[candidates], dtype=np.float32) @ normalize_rows(query_embedding)[0]
+        lexical = lexical[candidates]
+        if lexical.max() > 0:
+            lexical = lexical / lexical.max()
+        fused = (1 - weight) * dense + weight * lexical
+        order = np.lexsort((candidates, -fused))[:top_k]
+        return candidates[order], fused[order]
+
+    def _select(self, filters):
+        """Sorted live row ids matching `filters`, or None when every row qualifies."""
+        ids = self.filters.select(filters)
+        if self._live is None:
+            return ids
+        if ids is None:
+            return self._live
+        return np.setdiff1d(ids, self.deleted, assume_unique=True)
+
+    def _search_batch(self, query_embeddings, top_k, filters=None):
+        ids = self._select(filters)
+        if ids is None:
+            with SEARCH_SECONDS.time(index=type(self.index).__name__):
+                return self.index.search_batch(query_embeddings, top_k)
+        with SEARCH_SECONDS.time(index="filtered"):
+            return self._exact.search_subset(query_embeddings, ids, top_k)
+
@@ -0,0 +1,137 @@
+import re
+from collections import Counter
+
+import joblib
+import numpy as np
+
+# Word-level rewrites so spelling variants of a title share one role
+ROLE_WORDS = {
+    "sr": "senior",
+    "snr": "senior",
+    "jr": "junior",
+    "jnr": "junior",
+    "mgr": "manager",
+    "engg": "engineer",
+    "eng": "engineer",
+    "dev": "developer",
+    "devloper": "developer",
+    "ml": "machine learning",
+    "ai/ml": "ai machine learning",
+    "ii": "2",
+    "iii": "3",
+    "iv": "4",
+    "sde": "software development engineer",
+    "swe": "software engineer",
+    "bi": "business intelligence",
+}
+
+# Multi-word rewrites applied before word-level ones
+ROLE_PHRASES = {
+    "back end": "backend",
+    "back-end": "backend",
+    "front end": "frontend",
+    "front-end": "frontend",
+    "full stack": "fullstack",
+    "full-stack": "fullstack",
+    "react-native": "react native",
+    "ai ml": "ai/ml",
+}
+
+
+def normalize_role(title):
+    """Canonical key for a job title ("Sr. Data Engineer" -> "senior data engineer").
+
+    Keeps only the first "|"-separated segment, drops parentheticals,
+    punctuation and case, and expands common abbreviations.
+    """
+    if not isinstance(title, str):
+        return ""
+    role = re.sub(r"\([^)]*\)", " ", title.lower())
+    role = role.split("|")[0]
+    role = re.sub(r"[.,;:]", " ", role)
+    role = re.sub(r"\s+", " ", role).strip()
+    for phrase, replacement in ROLE_PHRASES.items():
+        role = re.sub(rf"\b{re.escape(phrase)}\b", replacement, role)
+    return " ".join(ROLE_WORDS.get(word, word) for word in role.split())
+
+
+class RoleIndex:
+    """Integer-coded normalized roles, one code per profile (-1 when blank).
+
+    Built once in the embedding pipeline (or at load time), so role ranking
+    is a similarity-weighted bincount over neighbor codes.
+    """
+
+    def __init__(self, codes, keys, display_names):
+        self.codes = codes
+        self.keys = keys
+        self.display_names = display_names
+
+    @classmethod
+    def build(cls, positions):
+        normalized = {}
+        spellings = Counter()
+        row_keys = []
+        for title in positions:
+            if title not in normalized:
+                normalized[title] = normalize_role(title)
+            key = normalized[title]
+            row_keys.append(key)
+            if key:
+                spellings[key, title.strip()] += 1
+
+        # Most common original spelling of each role is the one shown to users
+        display = {}
+        for (key, title), _ in spellings.most_common():
+            display.setdefault(key, title)
+
+        keys = [k for k, _ in Counter(k for k in row_keys if k).most_common()]
+        code_of = {k: i for i, k in enumerate(keys)}
+        codes = np.array([code_of.get(k, -1) for k in row_keys], dtype=np.int32)
+        return cls(codes, keys, [display[k] for k in keys])
+
+    def with_rows(self, positions):
+        """Copy of the index with `positions` appended.
+
+        Codes are then re-ranked by frequency over all rows like `build`
+        (ties keep their previous order), so lower codes stay more common.
+        """
+        added = RoleIndex.build(positions)
+        keys, display_names = list(self.keys), list(self.display_names)
+        code_of = {k: i for i, k in enumerate(keys)}
+        for key, display in zip(added.keys, added.display_names):
+            if key not in code_of:
+                code_of[key] = len(keys)
+                keys.append(key)
+                display_names.append(display)
+        # The trailing -1 keeps blank rows (code -1) blank
+        remap = np.array([code_of[k] for k in added.keys] + [-1], dtype=np.int32)
+        codes = np.concatenate([self.codes, remap[added.codes]])
+
+        order = np.argsort(-np.bincount(codes[codes >= 0], minlength=len(keys)), kind="stable")
+        rank = np.empty(len(order) + 1, dtype=np.int32)
+        rank[order] = np.arange(len(order))
+        rank[-1] = -1
+        return RoleIndex(rank[codes], [keys[i] for i in order], [display_names[i] for i in order])
+
+    @classmethod
+    def load(cls, path):
+        data = joblib.load(path)
+        return cls(data["codes"], data["keys"], data["display_names"])
+
+    def save(self, path):
+        joblib.dump({"codes": self.codes, "keys": self.keys, "display_names": self.display_names}, path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rank(self, neighbor_idx, weights, n_roles=3):
+        """Top roles among `neighbor_idx`, each voting with its similarity."""
+        codes = self.codes[neighbor_idx]
+        weights = np.clip(np.asarray(weights, dtype=np.float64), 0, None)
+        valid = codes >= 0
+        votes = np.bincount(codes[valid], weights=weights[valid], minlength=len(self))
+        # Tie-break by corpus frequency (lower code = more common role)
+        candidates = np.flatnonzero(votes > 0)
+        order = np.lexsort((candidates, -votes[candidates]))[:n_roles]
+        return [self.display_names[i] for i in candidates[order]]
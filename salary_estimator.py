@@ -0,0 +1,388 @@
+import os
+import re
+import csv
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from tqdm import tqdm
+
+from json_stream import iter_json_values
+
+# LLM salary enrichment: every profile gets a "salary_estimate" range and a
+# numeric "median_salary". Results are appended to a JSONL checkpoint keyed
+# by a hash of the profile, so a rerun skips everything already estimated
+# and identical profiles are only sent to the model once.
+
+INPUT_FILE = "combined.json"
+CHECKPOINT_FILE = "data/salary_checkpoint.jsonl"
+CACHE_FILE = "data/salary_cache.sqlite"
+CSV_FILE = "salary_output.csv"
+JSON_FILE = "output_with_salary.json"
+
+CSV_COLUMNS = [
+    "current_position", "current_company", "years_of_experience",
+    "education_degree", "city", "country", "salary_estimate", "median_salary"
+]
+
+logger = logging.getLogger(__name__)
+
+PROMPT = """
+    You are a professional compensation analyst in India.
+    Based on the candidate profile below, give the most accurate estimate of their
+    annual salary in INR.
+
+    Candidate Profile:
+    {profile}
+
+    Rules:
+    1. Only consider realistic salaries for the **city and role mentioned**.
+    2. Give the salary as a range with **maximum 20-25% difference** between min and max.
+    3. Use the following logic:
+        - Determine role, years of experience, skills, and certifications.
+        - Compare with typical market salaries in India for similar profiles.
+        - Consider location cost of living.
+        - Avoid extreme outliers.
+    4. Output **exactly as**: "X - Y LPA" or "X - Y INR" (use lakhs for clarity when appropriate)
+    5. **Keep the range tight** - no more than 25% difference between low and high values.
+
+    Examples of good ranges:
+    - "8 - 10 LPA" (25% range)
+    - "15 - 18 LPA" (20% range)
+    - "600000 - 720000 INR" (20% range)
+    """
+
+
+def extract_median_salary(salary_range_str):
+    """
+    Extracts numeric values from salary range and calculates median.
+    Examples: "8-10 LPA" → 9, "500000-600000 INR" → 550000
+    """
+    try:
+        # Remove common words and extract numbers
+        numbers = re.findall(r'[\d,]+\.?\d*', salary_range_str.replace(',', ''))
+
+        if len(numbers) >= 2:
+            low = float(numbers[0])
+            high = float(numbers[1])
+
+            # Check if it's in lakhs/crores format (typically smaller numbers)
+            if low < 1000 and 'L' in salary_range_str.upper():
+                low *= 100000
+                high *= 100000
+            elif low < 100 and 'CR' in salary_range_str.upper():
+                low *= 10000000
+                high *= 10000000
+
+            median = int((low + high) / 2)
+            return median
+        elif len(numbers) == 1:
+            # Single value provided
+            val = float(numbers[0])
+            if val < 1000 and 'L' in salary_range_str.upper():
+                val *= 100000
+            elif val < 100 and 'CR' in salary_range_str.upper():
+                val *= 10000000
+            return int(val)
+        else:
+            return 0
+    except Exception as e:
+        print(f"⚠️ Could not parse salary: {salary_range_str} - {e}")
+        return 0
+
+
+def build_prompt(profile):
+    return PROMPT.format(profile=json.dumps(profile, indent=2))
+
+
+def profile_key(profile):
+    """Stable identity of a profile: hash of its canonical JSON (without salary fields)."""
+    fields = {k: v for k, v in profile.items() if k not in ("salary_estimate", "median_salary")}
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMError(RuntimeError):
+    """Raised when a model call keeps failing after all retries."""
+
+
+class GeminiLLM:
+    """Google Gemini; the key is read from GEMINI_API_KEY (or GOOGLE_API_KEY)."""
+
+    def __init__(self, model="gemini-2.5-flash", api_key=None):
+        import google.generativeai as genai
+
+        api_key = api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+        if not api_key:
+            raise LLMError("Set GEMINI_API_KEY to use the Gemini backend")
+        genai.configure(api_key=api_key)
+        self.name = model
+        self.model = genai.GenerativeModel(model)
+
+    def __call__(self, prompt):
+        return self.model.generate_content(prompt).text.strip()
+
+
+class OllamaLLM:
+    """Ollama's /api/generate, or the stub in stub_embed_server.py for tests."""
+
+    def __init__(self, url="http://localhost:11434/api/generate", model="llama3.1", timeout=120):
+        self.url = url
+        self.name = model
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def __call__(self, prompt):
+        r = self.session.post(self.url, json={"model": self.name, "prompt": prompt, "stream": False},
+                              timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()["response"].strip()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class ResponseCache:
+    """Persistent (model, prompt) -> response text cache in a single SQLite file."""
+
+    def __init__(self, path=CACHE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name, prompt):
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model_name, prompt):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (self.key(model_name, prompt),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, model_name, prompt, response):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (self.key(model_name, prompt), response, time.time()),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def read_checkpoint(path):
+    """{profile key: record} from a JSONL checkpoint; a torn last line is ignored."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["key"]] = record
+    return done
+
+
+class SalaryEstimator:
+    """Estimates salaries for many profiles with bounded concurrency.
+
+    At most `max_workers` calls are in flight and calls start no faster
+    than `rate` per second (bursts of `burst`). Each finished profile is
+    appended to the checkpoint immediately, and responses are cached by
+    prompt so re-estimating an already seen profile never hits the model.
+    """
+
+    def __init__(self, llm, checkpoint_path=CHECKPOINT_FILE, cache=None, rate=1.0, burst=1, max_workers=4,
+                 max_retries=3, backoff=2.0):
+        self.llm = llm
+        self.checkpoint_path = checkpoint_path
+        self.cache = cache
+        self.bucket = TokenBucket(rate, burst)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = {"profiles": 0, "unique": 0, "resumed": 0, "cached": 0, "called": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def estimate(self, profile):
+        """(salary_estimate, median_salary) for one profile."""
+        # Profiles without a current company are not sent to the model
+        if not profile.get("current_company"):
+            return "0 INR", 0
+
+        prompt = build_prompt(profile)
+        model_name = getattr(self.llm, "name", type(self.llm).__name__)
+        cached = self.cache.get(model_name, prompt) if self.cache is not None else None
+        if cached is not None:
+            self._count("cached")
+            return cached, extract_median_salary(cached)
+
+        for attempt in range(1, self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                salary = self.llm(prompt)
+                break
+            except Exception as e:
+                logger.warning("LLM attempt %d/%d failed: %s", attempt, self.max_retries, e)
+                if attempt == self.max_retries:
+                    raise LLMError(f"LLM failed after {self.max_retries} attempts: {e}") from e
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random()))
+
+        self._count("called")
+        if self.cache is not None:
+            self.cache.put(model_name, prompt, salary)
+        return salary, extract_median_salary(salary)
+
+    def run(self, profiles, progress=True):
+        """Estimate every profile not yet in the checkpoint; returns {key: record}.
+
+        Failed profiles are logged and left out of the checkpoint so the
+        next run retries them.
+        """
+        done = read_checkpoint(self.checkpoint_path)
+        pending = {}
+        for profile in profiles:
+            self.stats["profiles"] += 1
+            key = profile_key(profile)
+            if key not in done:
+                pending.setdefault(key, profile)
+        self.stats["unique"] = len(pending) + len(done)
+        self.stats["resumed"] = len(done)
+
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        bar = tqdm(total=len(pending), desc="Estimating salaries", disable=not progress)
+        todo = iter(pending.items())
+        with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = {}
+            while True:
+                # Keep a bounded window of submitted work so memory stays flat
+                for key, profile in todo:
+                    in_flight[pool.submit(self.estimate, profile)] = key
+                    if len(in_flight) >= 2 * self.max_workers:
+                        break
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = in_flight.pop(future)
+                    bar.update(1)
+                    try:
+                        salary, median = future.result()
+                    except LLMError as e:
+                        self._count("failed")
+                        logger.error("Giving up on profile %s: %s", key[:12], e)
+                        continue
+                    record = {"key": key, "salary_estimate": salary, "median_salary": median}
+                    checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    checkpoint.flush()
+                    done[key] = record
+        bar.close()
+        return done
+
+
+def write_outputs(profiles, results, json_path=JSON_FILE, csv_path=CSV_FILE):
+    """Write every profile with its estimate ("ERROR" when missing) as JSON and CSV, in input order."""
+    enriched = []
+    for profile in profiles:
+        record = results.get(profile_key(profile))
+        enriched.append({
+            **profile,
+            "salary_estimate": record["salary_estimate"] if record else "ERROR",
+            "median_salary": record["median_salary"] if record else 0,
+        })
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(enriched, f, indent=2, ensure_ascii=False)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for profile in enriched:
+            writer.writerow([profile.get(col, "") for col in CSV_COLUMNS])
+    return enriched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add LLM salary estimates to profiles, resumably.")
+    parser.add_argument("--input", default=INPUT_FILE, help="JSON array or JSONL of profiles")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--cache", default=CACHE_FILE)
+    parser.add_argument("--output-json", default=JSON_FILE)
+    parser.add_argument("--output-csv", default=CSV_FILE)
+    parser.add_argument("--llm", choices=["gemini", "ollama", "stub"], default="gemini")
+    parser.add_argument("--model", default=None, help="Model name (default depends on --llm)")
+    parser.add_argument("--url", default="http://localhost:11434/api/generate", help="Ollama generate URL")
+    parser.add_argument("--rate", type=float, default=1.0, help="Max model calls started per second")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4, help="Max concurrent model calls")
+    parser.add_argument("--limit", type=int, default=None, help="Only the first N profiles")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.llm == "gemini":
+        llm = GeminiLLM(args.model or "gemini-2.5-flash")
+    elif args.llm == "ollama":
+        llm = OllamaLLM(args.url, args.model or "llama3.1")
+    else:
+        from stub_embed_server import start_stub_server
+
+        _, embed_url = start_stub_server(latency_ms=50)
+        llm = OllamaLLM(embed_url.replace("/api/embed", "/api/generate"), "stub")
+
+    profiles = []
+    for value in iter_json_values(args.input):
+        profiles.extend(value if isinstance(value, list) else [value])
+    profiles = profiles[:args.limit]
+
+    cache = ResponseCache(args.cache)
+    estimator = SalaryEstimator(
+        llm, args.checkpoint, cache=cache, rate=args.rate, burst=args.burst, max_workers=args.workers
+    )
+    results = estimator.run(profiles)
+    write_outputs(profiles, results, args.output_json, args.output_csv)
+    cache.close()
+
+    s = estimator.stats
+    print(f"🎉 {s['profiles']} profiles ({s['unique']} unique): {s['resumed']} resumed, "
+          f"{s['called']} model calls, {s['cached']} cached, {s['failed']} failed")
+    print(f"💾 Saved {args.output_json} and {args.output_csv}")
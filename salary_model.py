@@ -0,0 +1,208 @@
+import os
+import json
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from filter_index import normalize_place
+from vector_index import ExactIndex, normalize_rows
+
+# Local salary estimates learned from the LLM enrichment output
+# (salary_estimator.py), so salaries cost a matrix multiply instead of a
+# model call per profile.
+
+MODEL_FILE = "models/salary_knn.joblib"
+
+# Columns that identify a profile when joining salary output to embeddings
+IDENTITY_COLUMNS = ["current_position", "current_company", "years_of_experience", "total_skills", "city"]
+
+
+def identity_keys(df):
+    """One string per row built from IDENTITY_COLUMNS, stable across JSON/CSV/joblib round trips."""
+    parts = []
+    for col in IDENTITY_COLUMNS:
+        values = df[col] if col in df else pd.Series([""] * len(df), index=df.index)
+        if col == "years_of_experience":
+            values = pd.to_numeric(values, errors="coerce").round(1)
+        parts.append(values.astype(str).where(values.notna(), "").str.strip().str.lower())
+    return pd.Series(["\x1f".join(row) for row in zip(*parts)], index=df.index)
+
+
+def _years(values, missing=np.nan):
+    """Years of experience clipped to 0-40; missing or unparseable entries become `missing`."""
+    years = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    return np.clip(np.where(np.isnan(years), missing, years), 0, 40)
+
+
+class SalaryModel:
+    """kNN salary regression over profile embeddings with an experience/location baseline.
+
+    log(salary) is modelled as a ridge baseline on years of experience and
+    city, plus the similarity-weighted mean residual of the `k` nearest
+    training profiles. Missing years are read as `default_years` (the
+    training median) both when fitting and when predicting.
+    """
+
+    def __init__(self, vectors, log_salary, residuals, coef, intercept, cities, k=15, power=4.0, default_years=0.0):
+        self.index = ExactIndex(vectors, normalized=True)
+        self.log_salary = log_salary
+        self.residuals = residuals
+        self.coef = coef
+        self.intercept = intercept
+        self.cities = cities
+        self.k = k
+        self.power = power
+        self.default_years = default_years
+
+    @classmethod
+    def fit(cls, embeddings, salaries, years, cities, k=15, power=4.0, alpha=1.0, min_city_count=5):
+        """Fit on rows with a positive salary; `salaries` are annual INR (e.g. median_salary)."""
+        salaries = np.asarray(salaries, dtype=np.float64)
+        keep = np.isfinite(salaries) & (salaries > 0)
+        if not keep.any():
+            raise ValueError("No positive salaries to train on")
+        vectors = normalize_rows(np.asarray(embeddings)[keep])
+        log_salary = np.log(salaries[keep])
+        years = np.asarray(years, dtype=object)[keep]
+        places = [normalize_place(c) for c in np.asarray(cities, dtype=object)[keep]]
+
+        counts = pd.Series(places).value_counts()
+        city_list = [c for c, n in counts.items() if n >= min_city_count and c]
+        parsed = _years(years)
+        default_years = float(np.nanmedian(parsed)) if not np.isnan(parsed).all() else 0.0
+        model = cls(vectors, log_salary, None, None, 0.0, city_list, k=k, power=power, default_years=default_years)
+
+        # Ridge baseline in closed form; the intercept is not penalized
+        features = model._features(years, places)
+        mean_x, mean_y = features.mean(axis=0), log_salary.mean()
+        centered = features - mean_x
+        model.coef = np.linalg.solve(
+            centered.T @ centered + alpha * np.eye(features.shape[1]), centered.T @ (log_salary - mean_y)
+        )
+        model.intercept = float(mean_y - mean_x @ model.coef)
+        model.residuals = log_salary - (features @ model.coef + model.intercept)
+        return model
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        data = joblib.load(path)
+        # Models saved without default_years were fit with missing years as 0
+        return cls(data["vectors"], data["log_salary"], data["residuals"], data["coef"], data["intercept"],
+                   data["cities"], k=data["k"], power=data["power"], default_years=data.get("default_years", 0.0))
+
+    def save(self, path=MODEL_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump({
+            "vectors": self.index.vectors, "log_salary": self.log_salary, "residuals": self.residuals,
+            "coef": self.coef, "intercept": self.intercept, "cities": self.cities,
+            "k": self.k, "power": self.power, "default_years": self.default_years,
+        }, path)
+
+    def __len__(self):
+        return len(self.log_salary)
+
+    def _features(self, years, places):
+        years = _years(years, self.default_years)
+        city_of = {c: i for i, c in enumerate(self.cities)}
+        one_hot = np.zeros((len(years), len(self.cities)), dtype=np.float64)
+        for row, place in enumerate(places):
+            if place in city_of:
+                one_hot[row, city_of[place]] = 1.0
+        return np.column_stack([years, np.log1p(years), one_hot])
+
+    def predict_batch(self, query_embeddings, years=None, cities=None, exclude_self=False):
+        """Estimated annual salaries (INR) for many profiles at once.
+
+        `years` and `cities` are one entry per query (None/NaN when unknown).
+        With `exclude_self`, a neighbor identical to the query is skipped,
+        for scoring the training rows themselves.
+        """
+        n = len(query_embeddings)
+        years = years if years is not None else [None] * n
+        places = [normalize_place(c) for c in (cities if cities is not None else [None] * n)]
+
+        k = min(self.k + int(exclude_self), len(self))
+        idx, sims = self.index.search_batch(query_embeddings, k)
+        if exclude_self:
+            idx, sims = idx[:, 1:], sims[:, 1:]
+        weights = np.clip(sims, 1e-6, None) ** self.power
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        baseline = self._features(years, places) @ self.coef + self.intercept
+        return np.exp(baseline + (weights * self.residuals[idx]).sum(axis=1))
+
+    def predict(self, query_embedding, years=None, city=None):
+        return float(self.predict_batch([query_embedding], [years], [city])[0])
+
+
+def training_frame(salary_json, embeddings_df):
+    """Salary output rows joined to their embeddings on IDENTITY_COLUMNS."""
+    with open(salary_json, "r", encoding="utf-8") as f:
+        salaries = pd.DataFrame(json.load(f))
+    salaries = salaries[pd.to_numeric(salaries["median_salary"], errors="coerce") > 0]
+    salaries = salaries.assign(_key=identity_keys(salaries)).drop_duplicates("_key")
+    embedded = embeddings_df.assign(_key=identity_keys(embeddings_df)).drop_duplicates("_key")
+    return embedded.merge(salaries[["_key", "median_salary"]], on="_key").drop(columns="_key")
+
+
+def evaluate(df, vectors, test_fraction=0.2, random_state=0, **fit_kwargs):
+    """Holdout median absolute percentage error of the model and of a global-median baseline."""
+    rng = np.random.default_rng(random_state)
+    test = rng.random(len(df)) < test_fraction
+    train = ~test
+    model = SalaryModel.fit(vectors[train], df["median_salary"].values[train],
+                            df["years_of_experience"].values[train], df["city"].values[train], **fit_kwargs)
+    truth = df["median_salary"].to_numpy(dtype=np.float64)[test]
+    predicted = model.predict_batch(vectors[test], df["years_of_experience"].values[test], df["city"].values[test])
+    baseline = np.median(df["median_salary"].to_numpy(dtype=np.float64)[train])
+    return {
+        "train": int(train.sum()),
+        "test": int(test.sum()),
+        "mdape": float(np.median(np.abs(predicted - truth) / truth)),
+        "baseline_mdape": float(np.median(np.abs(baseline - truth) / truth)),
+    }
+
+
+if __name__ == "__main__":
+    from embedding_store import load_store
+
+    parser = argparse.ArgumentParser(description="Train the local salary model from LLM salary estimates.")
+    parser.add_argument("--salaries", default="output_with_salary.json", help="salary_estimator.py JSON output")
+    parser.add_argument("--embeddings", default="data/store", help="Embedding store or embeddings.joblib")
+    parser.add_argument("--output", default=MODEL_FILE)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--predict-csv", default=None, help="Also write predictions for every embedded profile")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.embeddings):
+        metadata, store_vectors, _ = load_store(args.embeddings)
+        corpus = metadata.assign(_row=np.arange(len(metadata)))
+    else:
+        corpus = joblib.load(args.embeddings)
+        store_vectors = np.vstack(corpus["embedding"].values)
+        corpus = corpus.drop(columns="embedding").assign(_row=np.arange(len(corpus)))
+
+    df = training_frame(args.salaries, corpus)
+    print(f"🔗 {len(df)} profiles with a salary and an embedding")
+    vectors = normalize_rows(np.asarray(store_vectors[df["_row"].values]))
+
+    report = evaluate(df, vectors, k=args.k)
+    print(f"📏 Holdout median abs. % error {report['mdape']:.1%} "
+          f"(global median baseline {report['baseline_mdape']:.1%}, {report['test']} test rows)")
+
+    model = SalaryModel.fit(vectors, df["median_salary"].values, df["years_of_experience"].values,
+                            df["city"].values, k=args.k)
+    model.save(args.output)
+    print(f"✅ Saved salary model ({len(model)} profiles) to {args.output}")
+
+    if args.predict_csv:
+        predictions = np.concatenate([
+            model.predict_batch(store_vectors[start:start + 4096],
+                                corpus["years_of_experience"].values[start:start + 4096],
+                                corpus["city"].values[start:start + 4096])
+            for start in range(0, len(corpus), 4096)
+        ])
+        corpus.drop(columns="_row").assign(predicted_salary=predictions.round()).to_csv(args.predict_csv, index=False)
+        print(f"💾 Wrote {len(corpus)} predictions to {args.predict_csv}")
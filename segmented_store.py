@@ -0,0 +1,421 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import load_store, write_store
+from salary_model import identity_keys
+from vector_index import ExactIndex, normalize_rows, top_k_rows
+
+# An updatable corpus made of immutable embedding stores ("segments"):
+#   segments.json  - segment names in order, their row counts and deleted
+#                    rows (tombstones), and a version bumped on every write
+#   seg-000000/    - a store written by embedding_store.write_store
+#   seg-000001/    - ...
+# New and updated profiles are written as new segments; a delete only adds
+# a tombstone. compact() merges all segments into one without the deleted
+# rows. segments.json is replaced atomically and is the only file readers
+# trust, so a reader never sees a half-written segment.
+SEGMENTS_FILE = "segments.json"
+ID_COLUMN = "profile_id"
+
+
+def profile_ids(df):
+    """The `profile_id` column, or a hash of the identity columns for profiles without one."""
+    if ID_COLUMN in df:
+        return df[ID_COLUMN].astype(str)
+    return identity_keys(df).map(lambda key: hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+
+
+def read_manifest(root="data/segments"):
+    path = os.path.join(root, SEGMENTS_FILE)
+    if not os.path.exists(path):
+        return {"version": 0, "next_segment": 0, "segments": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def deleted_rows(manifest):
+    """Sorted row ids (across all segments, in order) that have been deleted."""
+    rows, offset = [], 0
+    for segment in manifest["segments"]:
+        rows.append(np.asarray(segment["deleted"], dtype=np.int64) + offset)
+        offset += segment["count"]
+    return np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+
+def read_snapshot(root="data/segments", loaded=(), attempts=5):
+    """Manifest plus (name, metadata, vectors) of every segment not in `loaded`.
+
+    When the manifest's segments no longer start with `loaded` (they were
+    compacted), every segment is returned and `appended` is False.
+    Returns (manifest, segments, appended).
+    """
+    loaded = list(loaded)
+    for _ in range(attempts):
+        manifest = read_manifest(root)
+        names = [s["name"] for s in manifest["segments"]]
+        appended = names[:len(loaded)] == loaded
+        try:
+            segments = []
+            for name in names[len(loaded):] if appended else names:
+                df, vectors, _ = load_store(os.path.join(root, name))
+                segments.append((name, df, vectors))
+            return manifest, segments, appended
+        except FileNotFoundError:
+            time.sleep(0.05)  # compacted away between reading the manifest and the segment
+    raise RuntimeError(f"Segments under {root} kept changing while being read")
+
+
+class SegmentedVectors:
+    """Read-only row view over the segment matrices, indexed like one (n, dim) array."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.offsets = np.concatenate([[0], np.cumsum([len(p) for p in parts])]).astype(np.int64)
+        self.dtype = parts[0].dtype if parts else np.dtype(np.float32)
+        self.shape = (int(self.offsets[-1]), parts[0].shape[1] if parts else 0)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = np.concatenate(self.parts) if self.parts else np.empty(self.shape, dtype=self.dtype)
+        return matrix if dtype is None else matrix.astype(dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            key = np.arange(*key.indices(len(self)))
+        elif np.isscalar(key):
+            return self[np.array([key])][0]
+        ids = np.asarray(key, dtype=np.int64)
+        ids = np.where(ids < 0, ids + len(self), ids)
+        part_of = np.searchsorted(self.offsets, ids, side="right") - 1
+        rows = np.empty((len(ids), self.shape[1]), dtype=self.dtype)
+        for part in np.unique(part_of):
+            take = part_of == part
+            rows[take] = self.parts[part][ids[take] - self.offsets[part]]
+        return rows
+
+
+def _merge_top_k(results, n_queries, top_k):
+    """Global top-k from per-segment (idx, scores) with ids already offset."""
+    if not results:
+        return np.empty((n_queries, 0), dtype=np.int64), np.empty((n_queries, 0), dtype=np.float32)
+    all_idx = np.hstack([idx for idx, _ in results])
+    all_scores = np.hstack([scores for _, scores in results])
+    best = top_k_rows(all_scores, top_k)
+    return np.take_along_axis(all_idx, best, axis=1), np.take_along_axis(all_scores, best, axis=1)
+
+
+class SegmentedIndex:
+    """Exact cosine search over every segment, merged into one global top-k.
+
+    Row ids run across the segments in order. `with_segment` returns a new
+    index with one more segment and leaves this one untouched, so readers
+    holding the old index are never disturbed.
+    """
+
+    def __init__(self, parts):
+        self.parts = [ExactIndex(p, normalized=True) for p in parts]
+        self.vectors = SegmentedVectors([p.vectors for p in self.parts])
+        self.offsets = self.vectors.offsets
+
+    def with_segment(self, vectors):
+        return SegmentedIndex([p.vectors for p in self.parts] + [vectors])
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def search(self, query, top_k=10):
+        idx, scores = self.search_batch([query], top_k)
+        return idx[0], scores[0]
+
+    def search_batch(self, queries, top_k=10):
+        """Same contract as ExactIndex.search_batch."""
+        queries = normalize_rows(queries)
+        results = []
+        for part, offset in zip(self.parts, self.offsets):
+            idx, scores = part.search_batch(queries, top_k)
+            results.append((idx + offset, scores))
+        return _merge_top_k(results, len(queries), top_k)
+
+    def search_subset(self, queries, ids, top_k=10):
+        """Same contract as ExactIndex.search_subset; `ids` are global row ids."""
+        queries = normalize_rows(queries)
+        ids = np.asarray(ids, dtype=np.int64)
+        bounds = np.searchsorted(ids, self.offsets)
+        results = []
+        for part, offset, start, stop in zip(self.parts, self.offsets, bounds[:-1], bounds[1:]):
+            if stop > start:
+                idx, scores = part.search_subset(queries, ids[start:stop] - offset, top_k)
+                results.append((np.where(idx >= 0, idx + offset, -1), scores))
+        idx, scores = _merge_top_k(results, len(queries), top_k)
+
+        all_idx = np.full((len(queries), top_k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        all_idx[:, :idx.shape[1]], all_scores[:, :idx.shape[1]] = idx, scores
+        return all_idx, all_scores
+
+
+class _LiveRows:
+    """Rows of several segment matrices minus their deleted rows, sliceable for write_store."""
+
+    def __init__(self, parts):
+        self.parts = parts  # (vectors, kept row ids)
+        self.offsets = np.concatenate([[0], np.cumsum([len(keep) for _, keep in parts])]).astype(np.int64)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop, _ = key.indices(len(self))
+        blocks = []
+        for (vectors, keep), offset in zip(self.parts, self.offsets):
+            lo, hi = max(start - offset, 0), min(stop - offset, len(keep))
+            if hi > lo:
+                blocks.append(np.asarray(vectors[keep[lo:hi]], dtype=np.float32))
+        return np.concatenate(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+
+
+class SegmentedStore:
+    """Writer for a segmented store: add/update/delete profiles and compact.
+
+    Profiles are keyed by `profile_id` (see `profile_ids`); adding a profile
+    whose id already exists replaces it. Meant for one writing process;
+    within it, writes and compaction may run on different threads. Readers
+    use CareerRecommender.from_segments and refresh().
+    """
+
+    def __init__(self, root="data/segments", dtype="float32", model_name="bge-m3"):
+        self.root = root
+        self.dtype = dtype
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._compacting = threading.Lock()
+        self._compactor = None
+        self._stop = threading.Event()
+        os.makedirs(root, exist_ok=True)
+        self.manifest = read_manifest(root)
+        self._locations = self._read_locations()
+
+    def _read_locations(self):
+        """profile_id -> (segment name, row) for every live row."""
+        locations = {}
+        for segment in self.manifest["segments"]:
+            df, _, _ = load_store(os.path.join(self.root, segment["name"]))
+            deleted = set(segment["deleted"])
+            for row, pid in enumerate(df[ID_COLUMN].values):
+                if row not in deleted:
+                    locations[pid] = (segment["name"], row)
+        return locations
+
+    def _commit(self, manifest):
+        manifest["version"] += 1
+        path = os.path.join(self.root, SEGMENTS_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        self.manifest = manifest
+
+    def _copy_manifest(self):
+        return json.loads(json.dumps(self.manifest))
+
+    def __len__(self):
+        return len(self._locations)
+
+    def add(self, df, embeddings=None):
+        """Write profiles (a DataFrame with an `embedding` column, or `embeddings`) as a new segment.
+
+        Existing profiles with the same ids are tombstoned, so this is also
+        how profiles are updated. Returns the new segment's name.
+        """
+        df = df.reset_index(drop=True).assign(**{ID_COLUMN: profile_ids(df).values})
+        # Within one batch the last copy of an id wins
+        latest = ~df[ID_COLUMN].duplicated(keep="last").values
+        if embeddings is None:
+            embeddings = df["embedding"].values
+        if not latest.all():
+            df = df[latest].reset_index(drop=True)
+            embeddings = [e for e, keep in zip(embeddings, latest) if keep]
+        if not len(df):
+            return None
+
+        with self._lock:
+            manifest = self._copy_manifest()
+            name = f"seg-{manifest['next_segment']:06d}"
+            manifest["next_segment"] += 1
+            tmp = os.path.join(self.root, f".{name}.tmp")
+            write_store(df.drop(columns=["embedding"], errors="ignore"), tmp, dtype=self.dtype,
+                        model_name=self.model_name, embeddings=embeddings)
+            os.replace(tmp, os.path.join(self.root, name))
+
+            self._tombstone(manifest, df[ID_COLUMN].values)
+            manifest["segments"].append({"name": name, "count": len(df), "deleted": []})
+            self._commit(manifest)
+            for row, pid in enumerate(df[ID_COLUMN].values):
+                self._locations[pid] = (name, row)
+        return name
+
+    def delete(self, ids):
+        """Tombstone the profiles with these ids; returns how many were live."""
+        with self._lock:
+            manifest = self._copy_manifest()
+            removed = self._tombstone(manifest, [str(i) for i in ids])
+            if removed:
+                self._commit(manifest)
+        return removed
+
+    def _tombstone(self, manifest, ids):
+        segments = {s["name"]: s for s in manifest["segments"]}
+        removed = 0
+        for pid in ids:
+            location = self._locations.pop(pid, None)
+            if location is not None:
+                segments[location[0]]["deleted"].append(location[1])
+                removed += 1
+        for segment in segments.values():
+            segment["deleted"] = sorted(set(segment["deleted"]))
+        return removed
+
+    def needs_compaction(self, max_segments=8, max_deleted_ratio=0.2):
+        segments = self.manifest["segments"]
+        total = sum(s["count"] for s in segments)
+        deleted = sum(len(s["deleted"]) for s in segments)
+        return len(segments) > max_segments or (total and deleted / total > max_deleted_ratio)
+
+    def compact(self):
+        """Merge every current segment into one, dropping deleted rows.
+
+        The merge runs without blocking add/delete; segments added meanwhile
+        are kept after the merged one and deletes made meanwhile are carried
+        over. Returns the merged segment's name, or None when nothing was
+        written (nothing to compact, or every row was deleted).
+        """
+        with self._compacting:
+            with self._lock:
+                snapshot = self._copy_manifest()
+            merged = snapshot["segments"]
+            if not merged or (len(merged) == 1 and not merged[0]["deleted"]):
+                return None
+
+            frames, parts, new_row = [], [], {}
+            for segment in merged:
+                df, vectors, _ = load_store(os.path.join(self.root, segment["name"]))
+                keep = np.setdiff1d(np.arange(segment["count"]), segment["deleted"])
+                start = sum(len(k) for _, k in parts)
+                new_row[segment["name"]] = dict(zip(keep.tolist(), range(start, start + len(keep))))
+                frames.append(df.iloc[keep])
+                parts.append((vectors, keep))
+            live = _LiveRows(parts)
+            # Only one compaction runs at a time, so the temporary name is free;
+            # the segment number is taken only once the merge is committed
+            tmp = os.path.join(self.root, ".compact.tmp")
+            if len(live):
+                write_store(pd.concat(frames, ignore_index=True), tmp, dtype=self.dtype, model_name=self.model_name,
+                            embeddings=live)
+
+            with self._lock:
+                manifest = self._copy_manifest()
+                current = manifest["segments"][:len(merged)]
+                deleted = []
+                for before, now in zip(merged, current):
+                    late = set(now["deleted"]) - set(before["deleted"])
+                    deleted.extend(new_row[now["name"]][row] for row in late)
+                name, compacted = None, []
+                # A merge without live rows is dropped rather than written as an empty segment
+                if len(live):
+                    name = f"seg-{manifest['next_segment']:06d}"
+                    manifest["next_segment"] += 1
+                    os.replace(tmp, os.path.join(self.root, name))
+                    compacted = [{"name": name, "count": len(live), "deleted": sorted(deleted)}]
+                manifest["segments"] = compacted + manifest["segments"][len(merged):]
+                self._commit(manifest)
+                for pid, (segment, row) in list(self._locations.items()):
+                    if segment in new_row:
+                        self._locations[pid] = (name, new_row[segment][row])
+
+            # Open readers keep their memory maps; on Windows the files stay until they close
+            for segment in merged:
+                shutil.rmtree(os.path.join(self.root, segment["name"]), ignore_errors=True)
+        return name
+
+    def start_compaction(self, interval=60.0, max_segments=8, max_deleted_ratio=0.2):
+        """Compact on a daemon thread whenever `needs_compaction` says so, checking every `interval` s."""
+        def loop():
+            while not self._stop.wait(interval):
+                if self.needs_compaction(max_segments, max_deleted_ratio):
+                    self.compact()
+
+        self._stop.clear()
+        self._compactor = threading.Thread(target=loop, daemon=True)
+        self._compactor.start()
+        return self._compactor
+
+    def stop_compaction(self):
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add, delete and compact profiles in a segmented store.")
+    parser.add_argument("root", nargs="?", default="data/segments")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Embed new/updated profiles (JSON/JSONL) into a new segment")
+    add.add_argument("source", help="Profiles file, or an embeddings.joblib / store directory to import")
+    add.add_argument("--cache", default="data/embedding_cache.sqlite")
+    delete = sub.add_parser("delete", help="Tombstone profiles by profile_id")
+    delete.add_argument("ids", nargs="+")
+    compact = sub.add_parser("compact", help="Merge segments and drop deleted rows")
+    compact.add_argument("--watch", type=float, default=None,
+                         help="Keep running, compacting when needed every WATCH seconds")
+    compact.add_argument("--max-segments", type=int, default=8)
+    sub.add_parser("info", help="Show segments and tombstones")
+    args = parser.parse_args()
+
+    store = SegmentedStore(args.root)
+    if args.command == "add":
+        if os.path.isdir(args.source):
+            metadata, vectors, _ = load_store(args.source)
+            name = store.add(metadata, embeddings=vectors)
+        elif args.source.endswith(".joblib"):
+            import joblib
+            name = store.add(joblib.load(args.source))
+        else:
+            from career_embeddings import load_json_profiles
+            profiles = load_json_profiles(args.source, cache_path=args.cache, dedup=True)
+            name = store.add(pd.DataFrame.from_records(profiles))
+        print(f"✅ Wrote segment {name}; {len(store)} live profiles")
+    elif args.command == "delete":
+        print(f"🗑️ Deleted {store.delete(args.ids)} profiles; {len(store)} live profiles")
+    elif args.command == "compact":
+        if args.watch:
+            store.start_compaction(args.watch, max_segments=args.max_segments)
+            print(f"🧹 Compacting {args.root} when it exceeds {args.max_segments} segments (Ctrl+C to stop)")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                store.stop_compaction()
+        else:
+            before = store.manifest["segments"]
+            name = store.compact()
+            segments = store.manifest["segments"]
+            print(f"✅ Compacted into {name}" if name else
+                  "🧹 Dropped fully deleted segments" if segments != before else "Nothing to compact")
+    for segment in store.manifest["segments"]:
+        print(f"  {segment['name']}: {segment['count']} rows, {len(segment['deleted'])} deleted")
@@ -0,0 +1,96 @@
+import os
+import time
+import argparse
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from cluster_profiles import ClusterProfiles, embed_skills, profiles_path
+
+# Choosing the number of skill clusters without the notebook's full KMeans
+# fits and O(n^2) silhouette: each k is fit with MiniBatchKMeans and scored
+# by silhouette on a fixed random sample, with the k values fit in parallel.
+# Like main.ipynb, clusters are fit on skills-only embeddings (`embed_skills`).
+
+# Not the tracked models/skill_clusters2.joblib: replacing that is an explicit --output
+SELECTED_MODEL_FILE = "models/skill_clusters_selected.joblib"
+
+
+def fit_k(vectors, k, sample, batch_size=4096, n_init=3, random_state=42):
+    """MiniBatchKMeans with `k` clusters, its inertia and silhouette on the `sample` rows."""
+    start = time.perf_counter()
+    model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, n_init=n_init, random_state=random_state)
+    model.fit(vectors)
+    labels = model.predict(vectors[sample])
+    # A sample that happens to land in one cluster has no silhouette
+    silhouette = silhouette_score(vectors[sample], labels) if len(np.unique(labels)) > 1 else -1.0
+    return {
+        "k": k,
+        "inertia": float(model.inertia_),
+        "silhouette": float(silhouette),
+        "seconds": time.perf_counter() - start,
+        "model": model,
+    }
+
+
+def sweep(vectors, k_values=range(2, 11), sample_size=10_000, n_jobs=-1, random_state=42, **fit_kwargs):
+    """`fit_k` for every k in parallel processes; rows in k order.
+
+    All k are scored on the same sample, so silhouettes are comparable.
+    """
+    rng = np.random.default_rng(random_state)
+    sample = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+    # joblib memory-maps large arrays for the workers instead of copying them per task
+    return Parallel(n_jobs=n_jobs)(
+        delayed(fit_k)(vectors, k, sample, random_state=random_state, **fit_kwargs) for k in k_values
+    )
+
+
+def best_k(rows):
+    """Row with the highest sampled silhouette (smaller k on ties)."""
+    return max(rows, key=lambda row: (row["silhouette"], -row["k"]))
+
+
+if __name__ == "__main__":
+    from embedding_store import load_store
+    from skill_index import SkillMatrix
+
+    parser = argparse.ArgumentParser(description="Pick the number of skill clusters and save the chosen model.")
+    parser.add_argument("--store", default="data/store", help="Embedding store or embeddings.joblib (for its rows)")
+    parser.add_argument("--cache", default="data/embedding_cache.sqlite", help="Embedding cache for skill vectors")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=10)
+    parser.add_argument("--k", type=int, default=None, help="Save this k instead of the best silhouette")
+    parser.add_argument("--sample-size", type=int, default=10_000, help="Rows used for silhouette")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel fits (-1 = all cores)")
+    parser.add_argument("--output", default=SELECTED_MODEL_FILE,
+                        help="Where to save the chosen model (models/skill_clusters2.joblib to replace it)")
+    args = parser.parse_args()
+
+    df = load_store(args.store)[0] if os.path.isdir(args.store) else joblib.load(args.store)
+    vectors = embed_skills(df["total_skills"].values, cache_path=args.cache)
+
+    k_values = range(args.k_min, args.k_max + 1)
+    if args.k is not None and args.k not in k_values:
+        k_values = sorted(set(k_values) | {args.k})
+    start = time.perf_counter()
+    rows = sweep(vectors, k_values, sample_size=args.sample_size, n_jobs=args.jobs, batch_size=args.batch_size)
+    print(f"⏱️ Swept k={args.k_min}..{args.k_max} over {len(vectors)} profiles in {time.perf_counter() - start:.1f}s")
+    for row in rows:
+        print(f"  k={row['k']:<3} silhouette={row['silhouette']:.3f}  SSE={row['inertia']:.1f}  "
+              f"({row['seconds']:.1f}s)")
+
+    chosen = next(row for row in rows if row["k"] == args.k) if args.k is not None else best_k(rows)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    joblib.dump(chosen["model"], args.output)
+    print(f"💾 Saved k={chosen['k']} model to {args.output}")
+
+    # Refresh the per-cluster stats so CareerRecommender.use_clusters need not rebuild them
+    ClusterProfiles.build(chosen["model"], vectors, SkillMatrix.build(df["total_skills"].values)).save(
+        profiles_path(args.output)
+    )
+    print(f"💾 Saved cluster profiles to {profiles_path(args.output)}")
@@ -0,0 +1,366 @@
+import os
+import copy
+import json
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from embedding_cache import EmbeddingCache
+from embedding_client import OLLAMA_URL, EmbeddingClient, EmbeddingError
+from query_cache import QueryEmbeddingCache
+from recommender import CareerRecommender
+from segmented_store import SEGMENTS_FILE
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("/health", "/metrics", "/recommend")
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+REQUEST_SECONDS = metrics.histogram("http_request_seconds", "End-to-end request latency by route and status")
+BATCH_SIZE = metrics.histogram("batch_size", "Requests per processed micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+BATCH_SECONDS = metrics.histogram("batch_processing_seconds", "Time spent processing one micro-batch")
+EXPIRED = metrics.counter("requests_expired_total", "Requests dropped because their deadline passed")
+FALLBACKS = metrics.counter("lexical_fallbacks_total", "Requests answered lexically because embedding failed")
+CLASSIFY_SECONDS = metrics.histogram("profile_classification_seconds", "Time spent typing one micro-batch of profiles")
+ERRORS = metrics.counter("request_errors_total", "Requests that failed with an unexpected error, by route")
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before its batch was processed."""
+
+
+class MicroBatcher:
+    """Coalesces requests that arrive within `window_ms` into one batch.
+
+    `process_batch` receives a list of items and must return one result per
+    item; it runs on a thread pool so the event loop stays responsive.
+    Requests whose deadline has already passed are dropped before the batch
+    is processed. If a batch raises, its items are retried one by one so the
+    error only reaches the request that caused it.
+    """
+
+    def __init__(self, process_batch, window_ms=5.0, max_batch=64, max_concurrent_batches=2):
+        self.process_batch = process_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_batches)
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.items = 0
+        self.expired = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, item, timeout):
+        """Queue `item` and wait for its result, at most `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self._queue.put((item, future, loop.time() + timeout))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded() from None
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            closes = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = closes - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            loop.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            now = loop.time()
+            live = [(item, future) for item, future, deadline in batch if not future.done() and deadline > now]
+            self.expired += len(batch) - len(live)
+            EXPIRED.inc(len(batch) - len(live))
+            if not live:
+                return
+            self.batches += 1
+            self.items += len(live)
+            BATCH_SIZE.observe(len(live))
+            try:
+                with BATCH_SECONDS.time():
+                    results = await loop.run_in_executor(self.executor, self.process_batch, [item for item, _ in live])
+            except Exception as e:
+                if len(live) == 1:
+                    results = [e]
+                else:
+                    results = await loop.run_in_executor(self.executor, self._process_each, [item for item, _ in live])
+            for (_, future), result in zip(live, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _process_each(self, items):
+        """One result or exception per item, each processed as its own batch."""
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append(self.process_batch([item])[0])
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "expired": self.expired,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+class RecommendationService:
+    """Keeps a CareerRecommender resident and answers batched requests.
+
+    Each batch makes one embedding call (through the query cache) and one
+    batched similarity search. Requests sent with `"trace": true` get the
+    batch's timing spans back under "trace". When the embedding service
+    fails, the batch is answered from the BM25 skill index instead and each
+    result is marked `"fallback": "lexical"`. If the recommender has a
+    salary model, results carry an "estimated_salary" for the query. With a
+    ProfileClassifier, results carry a "profile_type" predicted from the
+    skills plus any fields sent under "profile". With `refresh_seconds`, a
+    recommender loaded from a segmented store picks up new segments and
+    deletes on that interval.
+    """
+
+    def __init__(self, recommender, embedder, window_ms=5.0, max_batch=64, default_timeout_ms=2000,
+                 lexical_weight=0.0, classifier=None, refresh_seconds=None):
+        self.recommender = recommender
+        self.embedder = embedder
+        self.classifier = classifier
+        self.refresh_seconds = refresh_seconds
+        self.lexical_weight = lexical_weight
+        self.default_timeout = default_timeout_ms / 1000
+        self.batcher = MicroBatcher(self._process_batch, window_ms=window_ms, max_batch=max_batch)
+
+    def _process_batch(self, requests):
+        if not any(r.get("trace") for r in requests):
+            return self._recommend(requests)
+        with metrics.start_trace("batch") as trace:
+            results = self._recommend(requests)
+        spans = dict(trace.to_dict(), batch_size=len(requests))
+        for request, result in zip(requests, results):
+            if request.get("trace"):
+                result["trace"] = spans
+        return results
+
+    def _recommend(self, requests):
+        # One recommender for the whole batch, even if a refresh swaps it meanwhile
+        recommender = self.recommender
+        try:
+            embeddings = self.embedder.embed_many([r["skills"] for r in requests])
+        except EmbeddingError as e:
+            logger.warning("Embedding failed, answering %d requests lexically: %s", len(requests), e)
+            FALLBACKS.inc(len(requests))
+            embeddings = None
+        results = recommender.recommend_batch(
+            embeddings,
+            top_k=[r["top_k"] for r in requests],
+            user_skills=[r["skills"] for r in requests],
+            filters=[r.get("filters") for r in requests],
+            lexical_weight=self.lexical_weight,
+            as_records=True,
+        )
+        if embeddings is None:
+            for result in results:
+                result["fallback"] = "lexical"
+        elif recommender.salary_model is not None:
+            for result, salary in zip(results, recommender.estimate_salary_batch(embeddings)):
+                result["estimated_salary"] = round(float(salary))
+        if self.classifier is not None:
+            with CLASSIFY_SECONDS.time():
+                profiles = [dict(r.get("profile") or {}, total_skills=r["skills"]) for r in requests]
+                for result, profile_type in zip(results, self.classifier.predict_batch(profiles)):
+                    result["profile_type"] = profile_type
+        return results
+
+    async def handle(self, method, path, body):
+        """Route one request; returns (status, payload).
+
+        The payload is JSON-serializable, except for /metrics which returns
+        Prometheus text. Unexpected errors are logged and answered with 500.
+        """
+        try:
+            return await self._route(method, path, body)
+        except Exception:
+            logger.exception("Unhandled error answering %s %s", method, path)
+            ERRORS.inc(route=path if path in ROUTES else "other")
+            return 500, {"error": "internal server error"}
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "profiles": len(self.recommender.index)}
+        if method == "GET" and path == "/metrics":
+            return 200, metrics.render_prometheus()
+        if method != "POST" or path != "/recommend":
+            return 404, {"error": "not found"}
+
+        try:
+            request = json.loads(body or b"{}")
+            skills = str(request["skills"])
+            top_k = int(request.get("top_k", 10))
+            timeout = float(request.get("timeout_ms", self.default_timeout * 1000)) / 1000
+            trace = bool(request.get("trace", False))
+            filters = request.get("filters") or None
+            if filters is not None:
+                self.recommender.filters.validate(filters)
+            profile = request.get("profile") or None
+            if profile is not None and not isinstance(profile, dict):
+                raise TypeError("profile must be an object")
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"invalid request: {e}"}
+        if not skills.strip() or not 0 < top_k <= 100:
+            return 400, {"error": "skills must be non-empty and 0 < top_k <= 100"}
+
+        try:
+            item = {"skills": skills, "top_k": top_k, "filters": filters, "profile": profile, "trace": trace}
+            result = await self.batcher.submit(item, timeout)
+        except DeadlineExceeded:
+            return 504, {"error": "deadline exceeded"}
+        except EmbeddingError as e:
+            return 503, {"error": str(e)}
+        return 200, result
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: JSON in, JSON (or metrics text) out."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                route = path.split("?", 1)[0]
+                start = time.perf_counter()
+                status, payload = await self.handle(method, route, body)
+                REQUEST_SECONDS.observe(time.perf_counter() - start, route=route if route in ROUTES else "other",
+                                        status=status)
+                if isinstance(payload, str):
+                    data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+                else:
+                    data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _refresh_loop(self):
+        """Refresh a copy of the recommender off the event loop, then swap it in."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            updated = copy.copy(self.recommender)
+            try:
+                if await loop.run_in_executor(None, updated.refresh):
+                    self.recommender = updated
+                    logger.info("Refreshed recommender: %d profiles", len(updated.df) - len(updated.deleted))
+            except Exception:
+                logger.exception("Refreshing the recommender failed; still serving the previous one")
+
+    async def serve(self, host="127.0.0.1", port=8000, ready=None):
+        self.batcher.start()
+        if self.refresh_seconds:
+            asyncio.get_running_loop().create_task(self._refresh_loop())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+def load_recommender(path, index="exact", workers=None):
+    if os.path.exists(os.path.join(path, SEGMENTS_FILE)):
+        return CareerRecommender.from_segments(path)
+    if os.path.isdir(path):
+        return CareerRecommender.from_store(path, index=index, workers=workers)
+    return CareerRecommender(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve career recommendations over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--store", default="data/store", help="Embedding store directory or embeddings.joblib")
+    parser.add_argument("--index", default="exact", choices=["exact", "ivf", "sq8", "pq", "sharded"],
+                        help="Search index for store directories")
+    parser.add_argument("--workers", type=int, default=None, help="Search processes for --index sharded")
+    parser.add_argument("--refresh-seconds", type=float, default=10.0,
+                        help="How often a segmented store (segmented_store.py) is checked for changes")
+    parser.add_argument("--salary-model", default=None, help="Add estimated_salary from this salary_model.py model")
+    parser.add_argument("--profile-model", default=None,
+                        help="Add profile_type from this profile_classifier.py pipeline")
+    parser.add_argument("--profile-labels", default="models/profile_type_labels.json")
+    parser.add_argument("--embed-url", default=OLLAMA_URL)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Micro-batching window")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--timeout-ms", type=float, default=2000, help="Default per-request deadline")
+    parser.add_argument("--lexical-weight", type=float, default=0.0,
+                        help="Weight of BM25 skill matches fused with dense scores (0 = dense only)")
+    args = parser.parse_args()
+
+    recommender = load_recommender(args.store, args.index, args.workers)
+    if args.salary_model:
+        recommender.use_salary_model(args.salary_model)
+    classifier = None
+    if args.profile_model:
+        from profile_classifier import ProfileClassifier
+        classifier = ProfileClassifier.load(args.profile_model, args.profile_labels)
+    client = EmbeddingClient(args.embed_url, max_workers=4, timeout=args.timeout_ms / 1000, max_retries=2)
+    embedder = QueryEmbeddingCache(client, disk_cache=EmbeddingCache("data/query_cache.sqlite"))
+    service = RecommendationService(
+        recommender, embedder,
+        window_ms=args.window_ms, max_batch=args.max_batch, default_timeout_ms=args.timeout_ms,
+        lexical_weight=args.lexical_weight, classifier=classifier,
+        refresh_seconds=args.refresh_seconds if recommender.segments_root else None,
+    )
+    print(f"🚀 Serving on http://{args.host}:{args.port}/recommend")
+    asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,163 @@
+import os
+import time
+import weakref
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from vector_index import ExactIndex, normalize_rows, top_k_rows
+
+# Per-worker handle on the shared matrix, attached once by _init_worker
+_worker = {}
+
+
+def _init_worker(name, shape, dtype):
+    try:
+        from threadpoolctl import threadpool_limits
+        # One BLAS thread per worker: the pool itself provides the parallelism
+        _worker["limits"] = threadpool_limits(1)
+    except ImportError:
+        pass
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not make a worker's exit unlink the block
+    shm = shared_memory.SharedMemory(name=name)
+    _worker["shm"] = shm
+    _worker["vectors"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _search_shard(start, stop, queries, top_k):
+    """Top-k of one row range of the shared matrix, as global row ids."""
+    idx, scores = ExactIndex(_worker["vectors"][start:stop], normalized=True).search_batch(queries, top_k)
+    return idx + start, scores
+
+
+def _release(pool, shm):
+    pool.shutdown()
+    shm.unlink()
+    try:
+        shm.close()
+    except BufferError:
+        # Callers still hold views (e.g. recommender.embeddings). They keep the
+        # mapping alive and it is unmapped with the last of them; drop this
+        # handle's references so its own __del__ does not try to close it again
+        shm._buf = shm._mmap = None
+
+
+class ShardedIndex:
+    """Exact cosine search split across worker processes over shared memory.
+
+    The unit-normalized matrix is copied once into a shared memory block
+    and divided into `n_shards` contiguous row ranges. Each worker maps the
+    same block (no per-worker copy), searches the shards it is given and
+    returns a local top-k; the parent merges them into the global top-k.
+    Call `close()` (or use as a context manager) to stop the workers and
+    free the block; an index dropped without closing is released when it
+    is garbage collected.
+    """
+
+    def __init__(self, embeddings, n_shards=None, workers=None, normalized=False):
+        source = embeddings if normalized else normalize_rows(embeddings)
+        self.workers = workers or os.cpu_count() or 1
+        self.n_shards = n_shards or self.workers
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+        # frombuffer holds a buffer export, so the block cannot be unmapped under live views
+        self.vectors = np.frombuffer(self._shm.buf, dtype=source.dtype, count=source.size).reshape(source.shape)
+        for start in range(0, len(source), ExactIndex.block_size):
+            self.vectors[start:start + ExactIndex.block_size] = source[start:start + ExactIndex.block_size]
+
+        bounds = np.linspace(0, len(source), self.n_shards + 1).astype(np.int64)
+        self.shards = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        # Spawned workers avoid forking a parent that may already run threads (e.g. server.py)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._shm.name, self.vectors.shape, self.vectors.dtype.str),
+        )
+        self._finalizer = weakref.finalize(self, _release, self._pool, self._shm)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool = None
+            self.vectors = None
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def search(self, query, top_k=10):
+        idx, scores = self.search_batch([query], top_k)
+        return idx[0], scores[0]
+
+    def search_batch(self, queries, top_k=10):
+        """Same contract as ExactIndex.search_batch; shards are searched in parallel."""
+        queries = normalize_rows(queries)
+        futures = [
+            self._pool.submit(_search_shard, start, stop, queries, top_k) for start, stop in self.shards
+        ]
+        parts = [f.result() for f in futures]
+        if not parts:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        all_idx = np.hstack([idx for idx, _ in parts])
+        all_scores = np.hstack([scores for _, scores in parts])
+        best = top_k_rows(all_scores, top_k)
+        return np.take_along_axis(all_idx, best, axis=1), np.take_along_axis(all_scores, best, axis=1)
+
+
+def speedup_report(vectors, worker_counts, top_k=10, n_queries=64, repeats=3, random_state=0):
+    """Batch latency of ShardedIndex per worker count against single-process ExactIndex."""
+    rng = np.random.default_rng(random_state)
+    picks = np.sort(rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False))
+    queries = np.asarray(vectors[picks], dtype=np.float32)
+
+    def best_of(index):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            idx, _ = index.search_batch(queries, top_k)
+            timings.append(time.perf_counter() - start)
+        return min(timings), idx
+
+    baseline, exact_idx = best_of(ExactIndex(vectors, normalized=True))
+    rows = [{"workers": "exact", "seconds": baseline, "speedup": 1.0, "identical": True}]
+    for workers in worker_counts:
+        with ShardedIndex(vectors, workers=workers, normalized=True) as index:
+            index.search_batch(queries[:1], top_k)  # start the workers
+            seconds, idx = best_of(index)
+        rows.append({
+            "workers": workers,
+            "seconds": seconds,
+            "speedup": baseline / seconds,
+            "identical": bool(np.array_equal(idx, exact_idx)),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    from embedding_store import load_store
+
+    parser = argparse.ArgumentParser(description="Compare sharded multi-process search with single-process search.")
+    parser.add_argument("--store", default="data/store")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    _, vectors, _ = load_store(args.store)
+    for row in speedup_report(vectors, sorted(set(args.workers)), top_k=args.top_k, n_queries=args.queries):
+        print(f"workers={row['workers']:>5}  {1000 * row['seconds']:.1f} ms/batch  "
+              f"speedup {row['speedup']:.2f}x  identical={row['identical']}")
@@ -0,0 +1,167 @@
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+# Common spellings folded onto one canonical skill name
+SKILL_ALIASES = {
+    "js": "javascript",
+    "reactjs": "react",
+    "react.js": "react",
+    "react js": "react",
+    "nodejs": "node.js",
+    "node": "node.js",
+    "node js": "node.js",
+    "vuejs": "vue.js",
+    "vue": "vue.js",
+    "angularjs": "angular",
+    "nextjs": "next.js",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "golang": "go",
+    "c sharp": "c#",
+    "csharp": "c#",
+    "cpp": "c++",
+    "postgres": "postgresql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "tf": "tensorflow",
+    "sklearn": "scikit-learn",
+    "scikit learn": "scikit-learn",
+    "aws": "amazon web services",
+    "gcp": "google cloud platform",
+    "powerbi": "power bi",
+    "ms excel": "excel",
+    "microsoft excel": "excel",
+    "css": "cascading style sheets",
+    "oop": "object-oriented programming",
+    "llm": "large language models",
+    "llms": "large language models",
+    "ci/cd": "continuous integration and continuous delivery",
+    "rest": "representational state transfer",
+    "rest api": "representational state transfer",
+}
+
+# Trailing qualifiers such as "(Programming Language)" or an acronym "(AWS)"
+QUALIFIER = re.compile(r"\s*\((?:programming language|software|framework|[^()]{1,12})\)$")
+
+
+def normalize_skill(raw, aliases=SKILL_ALIASES):
+    """Canonical lower-case name of one skill ("Python (Programming Language)" -> "python")."""
+    skill = re.sub(r"\s+", " ", raw.strip().lower())
+    skill = QUALIFIER.sub("", skill)
+    return aliases.get(skill, skill)
+
+
+def split_skills(text, aliases=SKILL_ALIASES):
+    """Normalized skills of a comma separated list, in order, blanks dropped."""
+    if not isinstance(text, str):
+        return []
+    return [s for s in (normalize_skill(raw, aliases) for raw in text.split(",")) if s]
+
+
+class SkillMatrix:
+    """Sparse profile x skill incidence matrix with a shared skill vocabulary.
+
+    Built once from the `total_skills` column so skill suggestions are a
+    weighted sum over neighbor rows instead of string parsing per request.
+    """
+
+    def __init__(self, matrix, vocab, display_names):
+        self.matrix = matrix
+        self.vocab = vocab
+        self.display_names = display_names
+
+    @classmethod
+    def build(cls, total_skills):
+        # Raw spellings repeat heavily across profiles, so normalize each once
+        normalized = {}
+        spellings = Counter()
+        rows = []
+        for text in total_skills:
+            row = []
+            if isinstance(text, str):
+                for raw in text.split(","):
+                    raw = raw.strip()
+                    if not raw:
+                        continue
+                    if raw not in normalized:
+                        normalized[raw] = normalize_skill(raw)
+                    if not normalized[raw]:
+                        continue
+                    spellings[normalized[raw], raw] += 1
+                    row.append(normalized[raw])
+            rows.append(list(dict.fromkeys(row)))
+
+        # Most common original spelling of each skill is the one shown to users
+        display = {}
+        for (skill, raw), _ in spellings.most_common():
+            display.setdefault(skill, raw)
+
+        # Vocabulary ordered by document frequency, so ties favor common skills
+        frequency = Counter(s for row in rows for s in row)
+        names = [s for s, _ in frequency.most_common()]
+        vocab = {s: i for i, s in enumerate(names)}
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.fromiter((vocab[s] for row in rows for s in row), dtype=np.int32, count=indptr[-1])
+        data = np.ones(len(indices), dtype=np.float32)
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(vocab)))
+        return cls(matrix, vocab, [display[s] for s in names])
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def with_rows(self, total_skills):
+        """Copy of the matrix with rows for `total_skills` appended.
+
+        New skills extend the vocabulary, which is then re-sorted by document
+        frequency over all rows like `build` (ties keep their previous order).
+        """
+        added = SkillMatrix.build(total_skills)
+        vocab, display_names = dict(self.vocab), list(self.display_names)
+        for skill, display in zip(added.vocab, added.display_names):
+            if skill not in vocab:
+                vocab[skill] = len(vocab)
+                display_names.append(display)
+        remap = np.array([vocab[s] for s in added.vocab], dtype=np.int32)
+        old, new = self.matrix.tocsr(), added.matrix.tocsr()
+        matrix = sparse.vstack([
+            sparse.csr_matrix((old.data, old.indices, old.indptr), shape=(old.shape[0], len(vocab))),
+            sparse.csr_matrix((new.data, remap[new.indices], new.indptr), shape=(new.shape[0], len(vocab))),
+        ], format="csr")
+
+        order = np.argsort(-np.bincount(matrix.indices, minlength=len(vocab)), kind="stable")
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        matrix = sparse.csr_matrix((matrix.data, position[matrix.indices], matrix.indptr), shape=matrix.shape)
+        matrix.sort_indices()
+        names = list(vocab)
+        return SkillMatrix(matrix, {names[i]: c for c, i in enumerate(order)}, [display_names[i] for i in order])
+
+    def recommend(self, neighbor_idx, weights, exclude=None, n_skills=10):
+        """Top skills among `neighbor_idx`, weighted by similarity.
+
+        Skills in `exclude` (a skill string or iterable of skills the user
+        already has) are never returned.
+        """
+        weights = np.clip(np.asarray(weights, dtype=np.float32), 0, None)
+        scores = np.asarray(self.matrix[neighbor_idx].T @ weights).ravel()
+
+        if exclude:
+            known = split_skills(exclude) if isinstance(exclude, str) else [normalize_skill(s) for s in exclude]
+            known_ids = [self.vocab[s] for s in known if s in self.vocab]
+            scores[known_ids] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > n_skills:
+            candidates = candidates[np.argpartition(-scores[candidates], n_skills - 1)[:n_skills]]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [self.display_names[i] for i in candidates[order]]
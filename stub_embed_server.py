@@ -0,0 +1,107 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# A local, deterministic stand-in for Ollama's /api/embed endpoint. Each
+# text embeds as the normalized sum of fixed random vectors of its words,
+# so texts sharing words are close, without needing a real model.
+# /api/generate answers salary prompts (see salary_estimator.py) with a
+# range derived from the profile's years of experience.
+
+
+@lru_cache(maxsize=100_000)
+def _token_vector(token, dim):
+    seed = int.from_bytes(hashlib.sha1(token.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def stub_embedding(text, dim=1024):
+    vec = np.zeros(dim, dtype=np.float32)
+    for token in re.findall(r"\w+", text.lower()):
+        vec += _token_vector(token, dim)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def stub_salary(prompt):
+    """A "X - Y LPA" range that grows with the years of experience in the prompt."""
+    match = re.search(r'"years_of_experience":\s*([\d.]+)', prompt)
+    years = float(match.group(1)) if match else 0.0
+    low = round(4 + 2.5 * years)
+    return f"{low} - {round(low * 1.2)} LPA"
+
+
+def make_handler(dim, latency_ms, per_item_ms, fail_rate=0.0):
+    class StubEmbedHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path not in ("/api/embed", "/api/generate"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if fail_rate and random.random() < fail_rate:
+                self._send_json(503, {"error": "stub overloaded"})
+                return
+            if self.path == "/api/generate":
+                time.sleep(latency_ms / 1000)
+                self._send_json(200, {"model": body.get("model", "stub"), "response": stub_salary(body["prompt"])})
+                return
+            texts = body.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+
+            time.sleep((latency_ms + per_item_ms * len(texts)) / 1000)
+            self._send_json(200, {
+                "model": body.get("model", "stub"),
+                "embeddings": [stub_embedding(t, dim).tolist() for t in texts],
+            })
+
+    return StubEmbedHandler
+
+
+def start_stub_server(host="127.0.0.1", port=0, dim=1024, latency_ms=0.0, per_item_ms=0.0, fail_rate=0.0):
+    """Run the stub server on a daemon thread; returns (server, embed URL).
+
+    The generate endpoint is the same URL with /api/generate in place of /api/embed.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(dim, latency_ms, per_item_ms, fail_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api/embed"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic stand-in for Ollama's /api/embed.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay per request")
+    parser.add_argument("--per-item-ms", type=float, default=0.0, help="Extra delay per embedded text")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(args.dim, args.latency_ms, args.per_item_ms, args.fail_rate)
+    )
+    print(f"🧪 Stub embedding server on http://{args.host}:{args.port}/api/embed (dim={args.dim})")
+    server.serve_forever()
@@ -0,0 +1,27 @@
+import pytest
+
+from json_stream import iter_json_values
+
+
+def decode(tmp_path, text, chunk_size=3):
+    path = tmp_path / "input.json"
+    path.write_text(text, encoding="utf-8")
+    errors = []
+    values = list(iter_json_values(str(path), chunk_size=chunk_size, on_error=lambda *e: errors.append(e)))
+    return values, errors
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a":1},{"b":2}', [{"a": 1}, {"b": 2}]),
+    ('{"a":{"x":1}},\n{"b":2}', [{"a": {"x": 1}}, {"b": 2}]),
+    ('{"a":1}{"b":2}\n{"c":3}', [{"a": 1}, {"b": 2}, {"c": 3}]),
+    ('[{"a":1}, {"b":2}]', [{"a": 1}, {"b": 2}]),
+])
+def test_concatenated_values(tmp_path, text, expected):
+    assert decode(tmp_path, text) == (expected, [])
+
+
+def test_resyncs_after_malformed_object(tmp_path):
+    values, errors = decode(tmp_path, '{"a":1}\n{"b":}\n{"c":3}')
+    assert values == [{"a": 1}, {"c": 3}]
+    assert [offset for offset, _ in errors] == [8]
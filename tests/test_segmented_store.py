@@ -0,0 +1,76 @@
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender import CareerRecommender
+from segmented_store import SegmentedStore
+
+CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "csv", "combined.csv")
+
+
+@pytest.fixture
+def profiles():
+    df = pd.read_csv(CSV, nrows=60)
+    df = df.assign(profile_id=[f"p{i}" for i in range(60)], text=df["current_position"].fillna(""))
+    vectors = np.random.default_rng(0).standard_normal((60, 16)).astype(np.float32)
+    return df, vectors
+
+
+def live_ids(recommender, query, top_k=100):
+    """profile_ids the recommender can still return, densely and lexically."""
+    found = recommender.recommend(query, top_k=top_k)["profiles"].index
+    lexical, _ = recommender.lexical_search("python, sql, java, javascript", top_k)
+    return set(recommender.df["profile_id"].iloc[found]), set(recommender.df["profile_id"].iloc[lexical])
+
+
+def test_add_delete_refresh_compact_refresh(tmp_path, profiles):
+    df, vectors = profiles
+    store = SegmentedStore(str(tmp_path))
+    store.add(df.iloc[:30], embeddings=vectors[:30])
+    recommender = CareerRecommender.from_segments(str(tmp_path))
+
+    store.add(df.iloc[30:], embeddings=vectors[30:])
+    store.delete(["p0", "p31"])
+    assert recommender.refresh()
+    dense, lexical = live_ids(recommender, vectors[0])
+    assert len(dense) == 58 and not {"p0", "p31"} & (dense | lexical)
+
+    # Deleted during the compaction's merge: carried over as a tombstone
+    assert store.compact() is not None
+    assert store.manifest["next_segment"] == 3
+    assert store.compact() is None and store.manifest["next_segment"] == 3
+    store.delete(["p5"])
+    assert recommender.refresh()
+    assert recommender.segment_names == ["seg-000002"]
+    dense, lexical = live_ids(recommender, vectors[0])
+    assert len(dense) == 57 and not {"p0", "p5", "p31"} & (dense | lexical)
+
+
+def test_everything_deleted_then_readded(tmp_path, profiles):
+    df, vectors = profiles
+    store = SegmentedStore(str(tmp_path))
+    store.add(df.iloc[:20], embeddings=vectors[:20])
+    recommender = CareerRecommender.from_segments(str(tmp_path))
+
+    store.delete(df["profile_id"].iloc[:20])
+    assert store.compact() is None and store.manifest["segments"] == []
+    assert recommender.refresh()
+    assert live_ids(recommender, vectors[0]) == (set(), set())
+
+    store.add(df.iloc[20:25], embeddings=vectors[20:25])
+    assert recommender.refresh()
+    assert live_ids(recommender, vectors[20])[0] == {f"p{i}" for i in range(20, 25)}
+
+
+def test_refresh_needs_segmented_index(tmp_path, profiles):
+    df, vectors = profiles
+    store = SegmentedStore(str(tmp_path))
+    store.add(df.iloc[:30], embeddings=vectors[:30])
+    recommender = CareerRecommender.from_segments(str(tmp_path))
+    recommender.use_ivf(nlist=2)
+    store.add(df.iloc[30:], embeddings=vectors[30:])
+    with pytest.raises(ValueError, match="IVFIndex"):
+        copy.copy(recommender).refresh()
@@ -0,0 +1,288 @@
+import os
+import time
+import argparse
+
+import joblib
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """Return `matrix` as float32 with every row scaled to unit length."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_rows(scores, top_k):
+    """Column indices of the `top_k` highest scores in each row, best first.
+
+    Uses argpartition so only the selected k entries get fully sorted.
+    """
+    n_rows, n_cols = scores.shape
+    k = min(top_k, n_cols)
+    if k <= 0:
+        return np.empty((n_rows, 0), dtype=np.int64)
+
+    if k < n_cols:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class ExactIndex:
+    """Brute-force cosine search over a unit-normalized float32 matrix.
+
+    Rows are normalized once at construction, so a search is a single
+    matrix multiply followed by a partial top-k selection. Pass
+    `normalized=True` for matrices that are already unit length (e.g. a
+    memory-mapped store) to use them without copying.
+    """
+
+    # Rows scored per block when the matrix is not float32 (e.g. float16
+    # stores), so upcasting never materializes the whole matrix at once.
+    block_size = 65536
+    # Filtered searches gather the selected rows when they are at most this
+    # fraction of the corpus; larger selections score everything and mask.
+    subset_gather_ratio = 0.5
+
+    def __init__(self, embeddings, normalized=False):
+        self.vectors = embeddings if normalized else normalize_rows(embeddings)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def search(self, query, top_k=10):
+        """Return (indices, scores) of the `top_k` rows closest to `query`."""
+        idx, scores = self.search_batch([query], top_k)
+        return idx[0], scores[0]
+
+    def search_batch(self, queries, top_k=10):
+        """Answer many queries with one matrix multiply.
+
+        Returns two (n_queries, top_k) arrays: row indices and cosine scores.
+        """
+        sims = self.score(queries)
+        idx = top_k_rows(sims, top_k)
+        return idx, np.take_along_axis(sims, idx, axis=1)
+
+    def search_subset(self, queries, ids, top_k=10):
+        """`search_batch` restricted to the rows in `ids` (sorted row ids).
+
+        Small subsets are gathered and scored on their own, so selective
+        filters cost less than a full scan; large ones are scored in full
+        and masked. Rows are -1 padded when `ids` has fewer than `top_k` rows.
+        """
+        queries = normalize_rows(queries)
+        ids = np.asarray(ids, dtype=np.int64)
+        k = min(top_k, len(ids))
+        if len(ids) <= self.subset_gather_ratio * len(self):
+            sims = queries @ np.asarray(self.vectors[ids], dtype=np.float32).T
+            local = top_k_rows(sims, k)
+            idx, scores = ids[local], np.take_along_axis(sims, local, axis=1)
+        else:
+            sims = self.score(queries)
+            masked = np.full_like(sims, -np.inf)
+            masked[:, ids] = sims[:, ids]
+            idx = top_k_rows(masked, k)
+            scores = np.take_along_axis(masked, idx, axis=1)
+
+        all_idx = np.full((len(queries), top_k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        all_idx[:, :k], all_scores[:, :k] = idx, scores
+        return all_idx, all_scores
+
+    def score(self, queries):
+        """Cosine similarity of every query against every row."""
+        queries = normalize_rows(queries)
+        if self.vectors.dtype == np.float32:
+            return queries @ self.vectors.T
+
+        sims = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            block = np.asarray(self.vectors[start:start + self.block_size], dtype=np.float32)
+            sims[:, start:start + len(block)] = queries @ block.T
+        return sims
+
+
+def recall_at_k(approx_idx, exact_idx):
+    """Mean fraction of the exact top-k neighbors that the approximate search found."""
+    hits = [len(set(a) & set(e)) / max(len(e), 1) for a, e in zip(approx_idx, exact_idx)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def _assign(vectors, centroids, block_size=65536):
+    """Nearest centroid (by cosine) for every row, computed block by block."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(vectors, nlist, seed_centroids=None, n_iter=10, sample_size=100_000, random_state=42):
+    """Spherical k-means over a sample of unit-length rows.
+
+    `seed_centroids` (e.g. the cluster centers of models/skill_clusters2.joblib)
+    are used as the first initial centroids; the rest are random sample rows.
+    """
+    rng = np.random.default_rng(random_state)
+    n = len(vectors)
+    sample_idx = np.sort(rng.choice(n, size=min(sample_size, n), replace=False))
+    sample = np.asarray(vectors[sample_idx], dtype=np.float32)
+    nlist = min(nlist, len(sample))
+
+    init = []
+    if seed_centroids is not None:
+        seed_centroids = normalize_rows(seed_centroids)
+        if seed_centroids.shape[1] != sample.shape[1]:
+            raise ValueError(
+                f"Seed centroids have dim {seed_centroids.shape[1]}, embeddings have dim {sample.shape[1]}"
+            )
+        init.append(seed_centroids[:nlist])
+    n_random = nlist - sum(len(c) for c in init)
+    if n_random > 0:
+        init.append(sample[rng.choice(len(sample), size=n_random, replace=False)])
+    centroids = np.vstack(init)
+
+    for _ in range(n_iter):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty lists from random rows instead of letting them die
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file approximate index over unit-normalized vectors.
+
+    Rows are bucketed by their nearest centroid; a query scores the
+    centroids, then only the rows in its `nprobe` closest lists.
+    """
+
+    def __init__(self, vectors, centroids, list_offsets, list_ids, nprobe=8):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, embeddings, nlist=None, nprobe=8, seed_centroids=None, normalized=False, **train_kwargs):
+        """Train centroids and bucket every row. `nlist` defaults to 4 * sqrt(n)."""
+        vectors = embeddings if normalized else normalize_rows(embeddings)
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(vectors))))
+        centroids = train_centroids(vectors, nlist, seed_centroids=seed_centroids, **train_kwargs)
+        labels = _assign(vectors, centroids)
+        list_ids = np.argsort(labels, kind="stable").astype(np.int64)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(centroids)))])
+        return cls(vectors, centroids, list_offsets, list_ids, nprobe=nprobe)
+
+    @classmethod
+    def load(cls, path, vectors, nprobe=8):
+        data = np.load(path)
+        return cls(vectors, data["centroids"], data["list_offsets"], data["list_ids"], nprobe=nprobe)
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def search(self, query, top_k=10, nprobe=None):
+        idx, scores = self.search_batch([query], top_k, nprobe)
+        return idx[0], scores[0]
+
+    def search_batch(self, queries, top_k=10, nprobe=None):
+        """Same contract as ExactIndex.search_batch.
+
+        Rows are -1 padded when the probed lists hold fewer than `top_k` rows.
+        """
+        queries = normalize_rows(queries)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probes = top_k_rows(queries @ self.centroids.T, nprobe)
+
+        all_idx = np.full((len(queries), top_k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        for q, lists in enumerate(probes):
+            candidates = np.concatenate(
+                [self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists]
+            )
+            if not len(candidates):
+                continue
+            candidates.sort()
+            sims = np.asarray(self.vectors[candidates], dtype=np.float32) @ queries[q]
+            best = top_k_rows(sims[None, :], top_k)[0]
+            all_idx[q, :len(best)] = candidates[best]
+            all_scores[q, :len(best)] = sims[best]
+        return all_idx, all_scores
+
+
+def recall_report(vectors, index, nprobes=(1, 2, 4, 8, 16, 32), top_k=10, n_queries=200, random_state=0):
+    """Recall@k and mean latency of `index` at each nprobe against exact search.
+
+    Queries are perturbed corpus rows so the self-match does not dominate.
+    """
+    rng = np.random.default_rng(random_state)
+    picks = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = np.asarray(vectors[np.sort(picks)], dtype=np.float32)
+    queries = normalize_rows(queries + rng.normal(scale=0.5 / np.sqrt(queries.shape[1]), size=queries.shape))
+
+    exact = ExactIndex(vectors, normalized=True)
+    start = time.perf_counter()
+    exact_idx, _ = exact.search_batch(queries, top_k)
+    rows = [{"nprobe": "exact", "recall": 1.0, "ms_per_query": 1000 * (time.perf_counter() - start) / len(queries)}]
+
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        approx_idx, _ = index.search_batch(queries, top_k, nprobe=nprobe)
+        elapsed = time.perf_counter() - start
+        rows.append({
+            "nprobe": nprobe,
+            "recall": recall_at_k(approx_idx, exact_idx),
+            "ms_per_query": 1000 * elapsed / len(queries),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    from embedding_store import load_store
+
+    parser = argparse.ArgumentParser(description="Build an IVF index for an embedding store and report recall@k.")
+    parser.add_argument("--store", default="data/store")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--seed-model", default=None, help="KMeans joblib whose centroids seed the lists")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    _, vectors, _ = load_store(args.store)
+    seed = joblib.load(args.seed_model).cluster_centers_ if args.seed_model else None
+    ivf = IVFIndex.build(vectors, nlist=args.nlist, seed_centroids=seed, normalized=True)
+    ivf.save(os.path.join(args.store, "ivf.npz"))
+    print(f"✅ Built IVF index with {ivf.nlist} lists over {len(ivf)} vectors")
+
+    for row in recall_report(vectors, ivf, nprobes=args.nprobe, top_k=args.top_k):
+        print(f"nprobe={row['nprobe']:>5}  recall@{args.top_k}={row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query")